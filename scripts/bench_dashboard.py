@@ -0,0 +1,182 @@
+"""
+Benchmarks the Dash callbacks in webapp/app.py in-process.
+
+Synthetic datasets are resampled from the real crash table (with jittered
+coordinates) at several sizes. For each size a fresh Python process loads
+the app on that dataset and replays interaction traces through the
+callback functions:
+
+  year-drag      – dragging the upper year handle from 1950 to 2023
+  operators      – adding the busiest operators to the selection one by one
+  fatalities     – narrowing the fatalities range from both ends
+  map-zoom       – zooming the map in from world view to city level
+
+Every filter change calls all five data callbacks, like the browser does.
+The report shows p50/p95/p99 latency and peak traced memory per callback.
+
+    python scripts/bench_dashboard.py                     # 5k, 50k, 250k, 1M rows
+    python scripts/bench_dashboard.py --rows 5000 20000 --json bench.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SOURCE_CSV = os.path.join(ROOT, "data", "processed", "cleaned_aircrashes_geo_FINAL.csv")
+DEFAULT_ROWS = [5_000, 50_000, 250_000, 1_000_000]
+CALLBACKS = ["update_map", "update_kpis", "update_trend_line", "update_choropleth", "update_table"]
+
+
+def make_dataset(rows, path, seed=0):
+    """
+    Writes a synthetic crash table of `rows` rows resampled from the real one.
+    """
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    src = pd.read_csv(SOURCE_CSV)
+    df = src.sample(n=rows, replace=True, random_state=seed).reset_index(drop=True)
+    df["Latitude"] = (df["Latitude"] + rng.normal(0, 0.5, rows)).clip(-89.9, 89.9)
+    df["Longitude"] = (df["Longitude"] + rng.normal(0, 0.5, rows) + 180) % 360 - 180
+    df.to_csv(path, index=False)
+
+
+def viewport(zoom, lat=48.85, lon=2.35):
+    half_lon = 180 / 2 ** zoom
+    half_lat = min(half_lon / 2, 85)
+    return {
+        "mapbox.zoom": zoom,
+        "mapbox.center": {"lat": lat, "lon": lon},
+        "mapbox._derived": {"coordinates": [
+            [lon - half_lon, lat + half_lat], [lon + half_lon, lat + half_lat],
+            [lon + half_lon, lat - half_lat], [lon - half_lon, lat - half_lat],
+        ]},
+    }
+
+
+def traces(app):
+    """
+    Yields (trace name, year_range, operators, fatalities_range, relayout_data).
+    """
+    years, _, fatalities = app.DEFAULT_FILTERS
+    for end in range(1950, 2024):
+        yield "year-drag", [1908, end], None, fatalities, None
+
+    selected = []
+    for op in app.operator_index.top(10):
+        selected = selected + [op]
+        yield "operators", [1908, 2023], selected, fatalities, None
+
+    for k in range(0, 150, 5):
+        yield "fatalities", years, None, [k, 300 - k], None
+
+    for zoom in range(1, 13):
+        yield "map-zoom", [1908, 2023], None, fatalities, viewport(zoom)
+
+
+def replay(app, events, trace_memory):
+    timings = {name: [] for name in CALLBACKS}
+    peaks = dict.fromkeys(CALLBACKS, 0)
+    for _, years, operators, fatalities, relayout in events:
+        calls = {
+            "update_map": lambda: app.update_map(years, operators, fatalities, relayout),
+            "update_kpis": lambda: app.update_kpis(years, operators, fatalities),
+            "update_trend_line": lambda: app.update_trend_line(years, operators, fatalities),
+            "update_choropleth": lambda: app.update_choropleth(years, operators, fatalities),
+            "update_table": lambda: app.update_table(years, operators, fatalities, 0, 10, None),
+        }
+        for name, call in calls.items():
+            if trace_memory:
+                tracemalloc.reset_peak()
+                base = tracemalloc.get_traced_memory()[0]
+                call()
+                peaks[name] = max(peaks[name], tracemalloc.get_traced_memory()[1] - base)
+            else:
+                start = time.perf_counter()
+                call()
+                timings[name].append(time.perf_counter() - start)
+    return timings, peaks
+
+
+def run_worker(data_path):
+    """
+    Loads the app on `data_path` and replays all traces; returns the results.
+    """
+    import numpy as np
+
+    os.environ["AIRCRASH_DATA"] = data_path
+    sys.path.insert(0, os.path.join(ROOT, "webapp"))
+
+    start = time.perf_counter()
+    import app
+    app.warm_up()
+    load_seconds = time.perf_counter() - start
+    rows = len(app.store.frame())
+
+    events = list(traces(app))
+    timings, _ = replay(app, events, trace_memory=False)
+    app.filter_cache._entries.clear()   # measure memory on cold filters too
+    tracemalloc.start()
+    _, peaks = replay(app, events, trace_memory=True)
+    tracemalloc.stop()
+
+    result = {"rows": rows, "load_s": round(load_seconds, 3), "events": len(events), "callbacks": {}}
+    for name in CALLBACKS:
+        ms = np.array(timings[name]) * 1000
+        result["callbacks"][name] = {
+            "p50_ms": round(float(np.percentile(ms, 50)), 2),
+            "p95_ms": round(float(np.percentile(ms, 95)), 2),
+            "p99_ms": round(float(np.percentile(ms, 99)), 2),
+            "peak_mib": round(peaks[name] / 2**20, 2),
+        }
+    result["filter_cache"] = app.filter_cache.stats()
+    return result
+
+
+def print_report(results):
+    print(f"\n{'rows':>9}  {'callback':<18} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'peak MiB':>9}")
+    for res in results:
+        for name, stats in res["callbacks"].items():
+            print(f"{res['rows']:>9,}  {name:<18} {stats['p50_ms']:>8} {stats['p95_ms']:>8} "
+                  f"{stats['p99_ms']:>8} {stats['peak_mib']:>9}")
+        print(f"{'':>9}  load + warm-up {res['load_s']} s, {res['events']} events, "
+              f"filter cache hit rate {res['filter_cache']['hit_rate']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS)
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)   # internal: run one dataset
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker)))
+        return
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            path = os.path.join(tmp, f"crashes_{rows}.csv")
+            print(f"Generating {rows:,} rows...")
+            make_dataset(rows, path)
+            # One process per size, so module state and memory don't leak across runs
+            out = subprocess.run([sys.executable, __file__, "--worker", path],
+                                 capture_output=True, text=True, check=True, cwd=ROOT)
+            results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    print_report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print("Wrote", args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Checks src/location_normalizer.py against the original clean_location_string.
+
+Every distinct Location of the raw dataset goes through both the
+LocationNormalizer built from data/location_corrections.json and a copy of
+the function it replaced (data_cleaning.py before the tables moved to JSON).
+Any difference is printed and the script exits with status 1.
+
+    python scripts/check_normalizer.py
+    python scripts/check_normalizer.py --input data/raw/other.csv
+"""
+import argparse
+import csv
+import os
+import re
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+RAW_CSV = os.path.join(ROOT, "data", "raw", "aircrashesFullDataUpdated_2024.csv")
+
+
+def baseline_clean_location_string(location):
+    # Verbatim behaviour of data_cleaning.clean_location_string before location_normalizer.py
+    location = re.sub(r"\d+\s*(nm|km|miles)?\s*[NSEW]\s*of\s*", "", location, flags=re.IGNORECASE)
+
+    location_corrections = {
+        "Yugoslavia": "Serbia",
+        "Bugaria": "Bulgaria",
+        "Zaire": "Democratic Republic of Congo",
+        "Czechoslovakia": "Czech Republic",
+        "Binh Tahi Da": "Da Nang, Vietnam",
+        "Geti Democratic": "Democratic Republic of Congo",
+        "Nasaso": "Nassau, Bahamas",
+        "Rochefort  France": "Rochefort, France",
+        "Verona  - Villafranca Italy": "Verona, Italy",
+        "Mt. Giner Italy": "Monte Giner, Italy",
+        "Mt. Argentari Italy": "Monte Argentario, Italy",
+        "Wusong Jiangsu": "Wusong, China",
+        "U. S. Air Force": "",
+        "Soviet": "Russia",
+        "USSRAeroflot": "Russia",
+        "Kiev Ukraine": "Kyiv, Ukraine",
+        "Moscow USSR": "Moscow, Russia",
+    }
+    for old, new in location_corrections.items():
+        location = location.replace(old, new)
+
+    near_replacements = {
+        "Off Barnegat New": "Barnegat, New Jersey, USA",
+        "Off Townsville Australia": "Townsville, Queensland, Australia",
+        "Off Trapani Italy": "Trapani, Sicily, Italy",
+        "Off Gozo Malta": "Gozo, Malta",
+        "Off Folkestone England": "Folkestone, England, UK",
+    }
+    for old, new in near_replacements.items():
+        if old in location:
+            location = new
+
+    location = re.sub(r"\bMt\.\s*", "Mount ", location)
+    return re.sub(r"\s+", " ", location).strip()
+
+
+def distinct_locations(path):
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        return sorted({row["Location"] for row in csv.DictReader(f) if row["Location"]})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--input", default=RAW_CSV, help="CSV with a Location column")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.join(ROOT, "src"))
+    from location_normalizer import LocationNormalizer
+
+    normalizer = LocationNormalizer.from_file()
+    locations = distinct_locations(args.input)
+    mismatches = 0
+    for location in locations:
+        expected = baseline_clean_location_string(location)
+        got = normalizer.normalize(location)
+        if got != expected:
+            mismatches += 1
+            print(f"{location!r}: expected {expected!r}, got {got!r}")
+
+    print(f"{len(locations)} distinct locations, {mismatches} mismatches")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
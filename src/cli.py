@@ -0,0 +1,106 @@
+"""
+Command-line entry point for the whole project.
+
+    python src/cli.py clean               # raw CSV -> cleaned table (+ geocoding)
+    python src/cli.py geocode             # add coordinates to the cleaned table
+    python src/cli.py fix                 # pipeline.py: fix coordinates outside the declared country
+    python src/cli.py validate            # per-row geo status + reports/geo_validation_summary.md
+    python src/cli.py serve --port 8050   # run the Dash app
+
+Each subcommand imports what it needs when it runs, so `--help` and the
+light commands don't pay for geopandas, geopy or Dash.
+"""
+import argparse
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def cmd_clean(args):
+    import data_cleaning
+
+    data_cleaning.clean_aircrash_data(args.input, args.output or data_cleaning.CLEANED_FILE,
+                                      geocode=not args.no_geocode)
+
+
+def cmd_geocode(args):
+    import data_cleaning
+
+    data_cleaning.geocode_cleaned_data(args.input or data_cleaning.CLEANED_FILE,
+                                       args.output or data_cleaning.CLEANED_FILE)
+
+
+def cmd_fix(args):
+    import pipeline
+
+    pipeline.main(
+        raw=args.input or pipeline.RAW_CSV,
+        out_csv=args.output or pipeline.OUT_CSV,
+        out_parquet=pipeline.columnar_path(args.output) if args.output else pipeline.OUT_PARQUET,
+        batch_rows=args.batch_rows or pipeline.BATCH_ROWS,
+    )
+
+
+def cmd_validate(args):
+    import validate_geo
+
+    counts = validate_geo.main(args.input or validate_geo.CSV, args.shapefile or validate_geo.SHP)
+    if args.strict and counts.get("NO_COUNTRY_MATCH", 0):
+        sys.exit(1)
+
+
+def cmd_serve(args):
+    if args.data:
+        os.environ["AIRCRASH_DATA"] = os.path.abspath(args.data)
+    sys.path.insert(0, os.path.join(ROOT, "webapp"))
+    import app
+
+    app.app.run(host=args.host, port=args.port, debug=args.debug)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="Air crashes data pipeline and dashboard.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("clean", help="load and clean the raw dataset, then geocode it")
+    p.add_argument("--input", default="aircrashesFullDataUpdated_2024.csv",
+                   help="raw CSV file name in data/raw/")
+    p.add_argument("--output", help="cleaned CSV path (a .parquet copy is written next to it)")
+    p.add_argument("--no-geocode", action="store_true", help="skip the geocoding step")
+    p.set_defaults(func=cmd_clean)
+
+    p = sub.add_parser("geocode", help="add Latitude/Longitude to the cleaned table")
+    p.add_argument("--input", help="cleaned table (.csv or .parquet)")
+    p.add_argument("--output", help="output CSV path")
+    p.set_defaults(func=cmd_geocode)
+
+    p = sub.add_parser("fix", help="re-geocode points that fall outside their declared country")
+    p.add_argument("--input", help="geocoded table (.csv or .parquet)")
+    p.add_argument("--output", help="output CSV path")
+    p.add_argument("--batch-rows", type=int, help="rows per checkpointed batch")
+    p.set_defaults(func=cmd_fix)
+
+    p = sub.add_parser("validate", help="check every point against its declared country and write a report")
+    p.add_argument("--input", help="table to check (.csv or .parquet)")
+    p.add_argument("--shapefile", help="Natural Earth admin-0 shapefile")
+    p.add_argument("--strict", action="store_true", help="exit with status 1 if any point is in the wrong country")
+    p.set_defaults(func=cmd_validate)
+
+    p = sub.add_parser("serve", help="run the Dash web app")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8050)
+    p.add_argument("--data", help="dataset to serve (.csv, .parquet or .arrow)")
+    p.add_argument("--debug", action="store_true")
+    p.set_defaults(func=cmd_serve)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
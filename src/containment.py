@@ -0,0 +1,227 @@
+"""
+Point-in-country lookup at fine accuracy for close to coarse cost.
+
+Natural Earth 110m is fast but misplaces coastal and border points; 50m is
+accurate but has far more vertices. CountryLocator answers in tiers:
+
+1. bounding boxes: an STRtree over the 110m countries gives, for each point,
+   the few countries whose bbox contains it (everything else is rejected
+   without touching a polygon);
+2. prepared 110m geometries decide containment for those candidates;
+3. points within BAND_DEG of a 110m border or coastline, and points in no
+   110m country that fall in the bbox of a 50m polygon part, are checked
+   again against the 50m layer.
+
+The second rule is for the countries 110m leaves out altogether (Malta,
+Bahrain, Barbados, Samoa, ...), which have no 110m border to be near.
+Multipolygons are split into their parts for it, so open-ocean points
+don't escalate just for lying inside the bbox of a far-flung country.
+Most points sit well inside a country or out at sea and never reach step 3. Countries are
+identified by ADM0_A3, which every Natural Earth resolution shares (unlike
+ISO_A3, which is -99 for France, Norway, ...).
+"""
+import io
+import os
+import zipfile
+
+import numpy as np
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+NE_DIR = os.path.join(BASE_DIR, "data", "ne_admin0")
+NE_URL = "https://naciscdn.org/naturalearth/{res}/cultural/ne_{res}_admin_0_countries.zip"
+
+KEY = "ADM0_A3"
+BAND_DEG = 0.25   # ~25 km: larger than the 110m generalization error
+
+
+def layer_path(res):
+    """
+    Shapefile of the Natural Earth admin-0 layer at resolution `res`
+    ("110m", "50m", "10m"), in data/ne_admin0/ or a ne_<res>_admin_0_countries/
+    folder at the project root. None if neither exists.
+    """
+    name = f"ne_{res}_admin_0_countries"
+    for path in (os.path.join(NE_DIR, name + ".shp"), os.path.join(BASE_DIR, name, name + ".shp")):
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def ensure_layer(res):
+    """
+    Returns the layer's shapefile path, downloading it into data/ne_admin0/ if missing.
+    """
+    path = layer_path(res)
+    if path:
+        return path
+    import requests
+
+    print(f"► Downloading Natural Earth {res} countries…")
+    os.makedirs(NE_DIR, exist_ok=True)
+    z = requests.get(NE_URL.format(res=res), timeout=60)
+    z.raise_for_status()
+    with zipfile.ZipFile(io.BytesIO(z.content)) as f:
+        f.extractall(NE_DIR)
+    return layer_path(res)
+
+
+class _Layer:
+    """
+    One resolution: prepared geometries, a bbox index over them and one
+    over their boundaries.
+    """
+
+    def __init__(self, gdf, key=KEY):
+        import shapely
+
+        self.frame = gdf.reset_index(drop=True)
+        self.codes = self.frame[key].to_numpy(dtype=object)
+        self.geoms = np.asarray(self.frame.geometry.array)
+        shapely.prepare(self.geoms)
+        self.tree = shapely.STRtree(self.geoms)
+        self._border_tree = None
+        self._part_tree = None
+
+    def contains(self, points):
+        """
+        Position of the first geometry containing each point (-1 if none),
+        and how many points had no bbox candidate at all.
+        """
+        import shapely
+
+        pt_idx, geom_idx = self.tree.query(points)   # bbox intersections only
+        ok = shapely.contains(self.geoms[geom_idx], points[pt_idx])   # prepared geometries
+        found = np.full(len(points), -1)
+        # Reversed so the first matching geometry wins for overlapping polygons
+        found[pt_idx[ok][::-1]] = geom_idx[ok][::-1]
+        return found, len(points) - len(np.unique(pt_idx))
+
+    def near_border(self, points, band):
+        """
+        Boolean mask of the points within `band` degrees of any border or coastline.
+        """
+        import shapely
+
+        if self._border_tree is None:
+            self._border_tree = shapely.STRtree(shapely.boundary(self.geoms))
+        near = np.zeros(len(points), dtype=bool)
+        pt_idx, _ = self._border_tree.query(points, predicate="dwithin", distance=band)
+        near[pt_idx] = True
+        return near
+
+    def in_part_bbox(self, points):
+        """
+        Boolean mask of the points inside the bbox of any single polygon
+        (multipolygons split into their parts).
+        """
+        import shapely
+
+        if self._part_tree is None:
+            self._part_tree = shapely.STRtree(shapely.get_parts(self.geoms))
+        inside = np.zeros(len(points), dtype=bool)
+        inside[self._part_tree.query(points)[0]] = True
+        return inside
+
+
+class CountryLocator:
+    """
+    Tiered point-in-country engine.
+
+    Args:
+        coarse (GeoDataFrame): Natural Earth 110m countries.
+        fine (GeoDataFrame | str): Finer layer (50m or 10m), or its path to
+            load on first need. None checks everything against `coarse`.
+        band (float): Distance to a coarse border (degrees) under which a
+            point is checked again against the fine layer.
+    """
+
+    def __init__(self, coarse, fine=None, band=BAND_DEG):
+        self.coarse = _Layer(coarse)
+        self._fine = fine
+        self.band = band
+        self.stats = {}
+
+    @classmethod
+    def default(cls, coarse_path=None, fine_res="50m", download=True):
+        """
+        110m + `fine_res` layers from data/ne_admin0/ (downloaded when missing
+        and `download` is set). Falls back to 110m only if the fine layer
+        can't be found.
+        """
+        import geopandas as gpd
+
+        coarse_path = coarse_path or (ensure_layer("110m") if download else layer_path("110m"))
+        fine = layer_path(fine_res)
+        if fine is None and download:
+            try:
+                fine = ensure_layer(fine_res)
+            except Exception as e:
+                print(f"Warning: no {fine_res} layer ({e}); using 110m only.")
+        return cls(gpd.read_file(coarse_path), fine)
+
+    @property
+    def fine(self):
+        if isinstance(self._fine, (str, os.PathLike)):
+            import geopandas as gpd
+
+            self._fine = _Layer(gpd.read_file(self._fine))
+        elif self._fine is not None and not isinstance(self._fine, _Layer):
+            self._fine = _Layer(self._fine)
+        return self._fine
+
+    @property
+    def finest(self):
+        """
+        GeoDataFrame of the most detailed layer available.
+        """
+        return (self.fine or self.coarse).frame
+
+    def locate(self, lat, lon):
+        """
+        ADM0_A3 code of the country containing each point, None outside
+        every country or without coordinates.
+
+        Returns:
+            ndarray: object array, same length as `lat`.
+        """
+        import shapely
+
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        codes = np.full(len(lat), None, dtype=object)
+        valid = np.flatnonzero(~(np.isnan(lat) | np.isnan(lon)))
+        points = shapely.points(lon[valid], lat[valid])
+
+        found, bbox_rejected = self.coarse.contains(points)
+        hit = found >= 0
+        codes[valid[hit]] = self.coarse.codes[found[hit]]
+
+        escalate = np.zeros(len(points), dtype=bool)
+        if self._fine is not None and len(points):
+            escalate = self.coarse.near_border(points, self.band)
+            # A coarse miss away from every coarse boundary can still be on a
+            # country the coarse layer lacks (Malta, Bahrain): check it when it
+            # falls in the bbox of a fine polygon part
+            missed = ~hit & ~escalate
+            if missed.any():
+                escalate[missed] = self.fine.in_part_bbox(points[missed])   # loads the fine layer
+            if escalate.any():
+                fine = self.fine
+                fine_found, _ = fine.contains(points[escalate])
+                codes[valid[escalate]] = np.where(fine_found >= 0, fine.codes[fine_found], None)
+
+        self.stats = {
+            "points": len(lat),
+            "missing_coords": len(lat) - len(valid),
+            "bbox_rejected": int(bbox_rejected),
+            "coarse_only": int(len(points) - escalate.sum()),
+            "escalated": int(escalate.sum()),
+        }
+        return codes
+
+    def attribute(self, codes, column):
+        """
+        Maps ADM0_A3 codes to another layer column (e.g. ADMIN), from the finest layer.
+        """
+        lookup = dict(zip(self.finest[KEY], self.finest[column]))
+        return np.array([lookup.get(code) for code in codes], dtype=object)
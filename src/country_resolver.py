@@ -0,0 +1,136 @@
+"""
+Country name -> ISO alpha-3 resolution for free-text locations.
+
+The alias table is built once from pycountry (names, official and common
+names, alpha-2/alpha-3 codes), a list of historical names (USSR, Zaire,
+Yugoslavia, ...) and the outdated names already fixed by the location
+normalizer (data/location_corrections.json). Exact aliases are a dict
+lookup; what is left is matched in one batched rapidfuzz pass over all the
+distinct names, instead of one extractOne call per row.
+"""
+import pycountry
+from rapidfuzz import fuzz, process
+
+from gazetteer import normalize_place
+from location_normalizer import default_normalizer
+
+# Former or informal names that pycountry doesn't know (successor state)
+HISTORIC_NAMES = {
+    "USSR": "RUS", "U.S.S.R.": "RUS", "Soviet Union": "RUS", "Russian Federation": "RUS",
+    "Zaire": "COD", "Belgian Congo": "COD", "Congo Kinshasa": "COD", "Congo Brazzaville": "COG",
+    "Yugoslavia": "SRB", "Serbia and Montenegro": "SRB",
+    "Czechoslovakia": "CZE", "East Germany": "DEU", "West Germany": "DEU",
+    "Burma": "MMR", "Ceylon": "LKA", "Rhodesia": "ZWE", "Southern Rhodesia": "ZWE",
+    "Northern Rhodesia": "ZMB", "Persia": "IRN", "Siam": "THA", "Dahomey": "BEN",
+    "Upper Volta": "BFA", "Tanganyika": "TZA", "Zanzibar": "TZA", "British Honduras": "BLZ",
+    "Dutch Guiana": "SUR", "Dutch East Indies": "IDN", "Netherlands East Indies": "IDN",
+    "French Indochina": "VNM", "South Vietnam": "VNM", "North Vietnam": "VNM",
+    "Formosa": "TWN", "Kampuchea": "KHM", "Swaziland": "SWZ", "Ivory Coast": "CIV",
+    "Macedonia": "MKD", "Cape Verde": "CPV", "East Pakistan": "BGD",
+    "U.S.A.": "USA", "United States of America": "USA",
+    "UK": "GBR", "U.K.": "GBR", "England": "GBR", "Scotland": "GBR", "Wales": "GBR",
+    "Northern Ireland": "GBR", "Great Britain": "GBR",
+    "South Korea": "KOR", "North Korea": "PRK", "Russia": "RUS", "Iran": "IRN",
+    "Syria": "SYR", "Laos": "LAO", "Vietnam": "VNM", "Bolivia": "BOL", "Venezuela": "VEN",
+    "Tanzania": "TZA", "Moldova": "MDA", "Taiwan": "TWN",
+}
+
+FUZZY_CUTOFF = 80   # same threshold the pipeline used with extractOne
+
+
+def _pycountry_iso(name):
+    try:
+        return pycountry.countries.lookup(name).alpha_3
+    except LookupError:
+        return None
+
+
+class CountryResolver:
+    """
+    Resolves country names to ISO alpha-3 codes.
+
+    Args:
+        extra_aliases (dict): Optional name -> ISO alpha-3 entries, added on
+            top of the built-in ones.
+    """
+
+    def __init__(self, extra_aliases=None):
+        aliases, codes = {}, set()
+        for country in pycountry.countries:
+            for attr in ("name", "official_name", "common_name"):
+                if hasattr(country, attr):
+                    aliases[normalize_place(getattr(country, attr))] = country.alpha_3
+            for attr in ("alpha_2", "alpha_3"):
+                code = normalize_place(getattr(country, attr))
+                aliases[code] = country.alpha_3
+                codes.add(code)
+
+        # Outdated names the location normalizer rewrites, e.g. "Zaire" -> "Democratic Republic of Congo"
+        for old, new in default_normalizer().corrections.items():
+            iso = _pycountry_iso(new.split(",")[-1].strip()) if new else None
+            if iso:
+                aliases.setdefault(normalize_place(old), iso)
+
+        for name, iso in {**HISTORIC_NAMES, **(extra_aliases or {})}.items():
+            aliases[normalize_place(name)] = iso
+
+        aliases.pop("", None)
+        self.aliases = aliases
+        # Fuzzy candidates: names only. Two- and three-letter codes are exact
+        # matches, or short words would score on them ("Near" ~ NER, "Tura" ~ TUR)
+        self.keys = [key for key in aliases if key not in codes]
+        self._memo = {}
+
+    def resolve_many(self, names):
+        """
+        Resolves a batch of country strings.
+
+        Args:
+            names (iterable): Country names; duplicates and non-strings are fine.
+
+        Returns:
+            dict: {name: ISO alpha-3 or None} for every distinct string.
+        """
+        result, pending = {}, {}
+        for name in dict.fromkeys(n for n in names if isinstance(n, str)):
+            if name in self._memo:
+                result[name] = self._memo[name]
+                continue
+            key = normalize_place(name)
+            iso = self.aliases.get(key)
+            if iso is not None or not key:
+                result[name] = iso
+            else:
+                pending[name] = key
+
+        if pending:
+            # One score matrix for all the unmatched names (C++, all cores)
+            scores = process.cdist(list(pending.values()), self.keys,
+                                   scorer=fuzz.token_sort_ratio, workers=-1)
+            best = scores.argmax(axis=1)
+            for (name, _), col, row in zip(pending.items(), best, scores):
+                result[name] = self.aliases[self.keys[col]] if row[col] > FUZZY_CUTOFF else None
+
+        self._memo.update(result)
+        return result
+
+    def resolve(self, name):
+        """
+        Resolves one country string; None when nothing matches well enough.
+        """
+        if not isinstance(name, str):
+            return None
+        return self.resolve_many([name])[name]
+
+
+_default = None
+
+
+def default_resolver():
+    """
+    Returns the shared resolver, built on first use.
+    """
+    global _default
+    if _default is None:
+        _default = CountryResolver()
+    return _default
@@ -1,13 +1,14 @@
 import os
 import pandas as pd
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut
-import time
-import shutil
 import atexit
-import re
 import sys
 
+from geocache import open_cache
+from gazetteer import load_default_gazetteer
+from geocode_scheduler import GeocodeScheduler, NominatimBackend   # geopy only imported when geocoding
+from location_normalizer import default_normalizer
+from storage import columnar_path, read_table, write_table
+
 """ /////////// in comment after finishing the cleaning process and switching to the notebook /////////////
 you can skip this 2 fonction coming it s just for solving a problem I had with fetching the data from the API,
 I had to use the geopy library to get the latitude and longitude of the locations in the dataset , 
@@ -49,12 +50,51 @@ atexit.register(remove_lock_file)
 
 """
 
-def load_data(file_name):
+MONTHS = ['January', 'February', 'March', 'April', 'May', 'June',
+          'July', 'August', 'September', 'October', 'November', 'December']
+
+# Declared dtypes of the raw file. Repeated strings become categoricals, and
+# Month an ordered categorical (1-byte codes that still read as month names);
+# counts are small nullable ints so a missing value doesn't force float64.
+RAW_SCHEMA = {
+    'Year': 'Int16',
+    'Quarter': 'category',
+    'Month': pd.CategoricalDtype(MONTHS, ordered=True),
+    'Day': 'Int8',
+    'Country/Region': 'category',
+    'Aircraft Manufacturer': 'category',
+    'Aircraft': 'category',
+    'Location': 'object',
+    'Operator': 'category',
+    'Ground': 'Int16',
+    'Fatalities (air)': 'Int16',
+    'Aboard': 'Int16',
+}
+
+
+def memory_report(df, label="Dataset"):
+    """
+    Prints the deep memory usage of a DataFrame, in total and per column.
+
+    Returns:
+        int: Total bytes.
+    """
+    usage = df.memory_usage(deep=True, index=False)
+    print(f"{label} memory: {usage.sum() / 2**20:.2f} MiB")
+    for col, nbytes in usage.sort_values(ascending=False).items():
+        print(f"  {col:<25} {str(df[col].dtype):<12} {nbytes / 2**10:>10.1f} KiB")
+    return int(usage.sum())
+
+
+def load_data(file_name, columns=None):
     """
-    Loads the air crash dataset from the raw data folder.
+    Loads the air crash dataset from the raw data folder, with the dtypes
+    declared in RAW_SCHEMA.
 
     Args:
         file_name (str): Name of the CSV file.
+        columns (list): Optional subset of columns to read (default: every
+            column of RAW_SCHEMA found in the file).
 
     Returns:
         DataFrame: Loaded dataset or None if there's an issue.
@@ -64,10 +104,17 @@ def load_data(file_name):
 
     print(f"Looking for dataset at: {file_path}")
 
+    wanted = set(columns or RAW_SCHEMA)
+
 #error handling
     try:
-        df = pd.read_csv(file_path)
+        df = pd.read_csv(
+            file_path,
+            usecols=lambda col: col in wanted,
+            dtype={col: dtype for col, dtype in RAW_SCHEMA.items() if col in wanted},
+        )
         print(f"Data loaded successfully ({len(df)} rows).")
+        memory_report(df)
         return df
     except FileNotFoundError:
         print(f"Error: File not found at {file_path}")
@@ -116,19 +163,25 @@ def clean_data(df):
     else:
         print("Warning: Latitude and Longitude columns are missing.")
 
-    for col in df.select_dtypes(include=['float64', 'int64']):
-        df[col] = df[col].fillna(df[col].median())
+    for col in df.select_dtypes(include='number'):
+        median = df[col].median()
+        if pd.api.types.is_integer_dtype(df[col]) and pd.notna(median):
+            median = round(median)   # keep Int16/Int8 columns integer
+        df[col] = df[col].fillna(median)
 
-    for col in df.select_dtypes(include=['object']):
+    # Categoricals too: the mode is always one of the existing categories
+    for col in df.select_dtypes(include=['object', 'category']):
         df[col] = df[col].fillna(df[col].mode().iloc[0])
 
 
     date_cols = ['Year', 'Month', 'Day']
     for col in date_cols:
-        if col in df.columns:
+        # Already typed when loaded through RAW_SCHEMA (Month as month names)
+        if col in df.columns and df[col].dtype == object:
             df[col] = pd.to_numeric(df[col], errors='coerce')
 
     print(f"Cleaning complete. {df.shape[0]} rows, {df.shape[1]} columns remaining.")
+    memory_report(df, "Cleaned dataset")
     return df
 
 
@@ -138,64 +191,23 @@ def clean_location_string(location):
     """
     Cleans a location string to create a broader search query.
     Removes unnecessary words, distance markers, and outdated names.
+
+    The correction tables are in data/location_corrections.json; see
+    location_normalizer.py.
     """
-    # Remove distance markers like "950 nm S of", "50 km N of"
-    location = re.sub(r"\d+\s*(nm|km|miles)?\s*[NSEW]\s*of\s*", "", location, flags=re.IGNORECASE)
-
-    # Replace outdated country names with modern equivalents
-    location_corrections = {
-        "Yugoslavia": "Serbia",
-        "Bugaria": "Bulgaria",
-        "Zaire": "Democratic Republic of Congo",
-        "Czechoslovakia": "Czech Republic",
-        "Binh Tahi Da": "Da Nang, Vietnam",
-        "Geti Democratic": "Democratic Republic of Congo",
-        "Nasaso": "Nassau, Bahamas",
-        "Rochefort  France": "Rochefort, France",
-        "Verona  - Villafranca Italy": "Verona, Italy",
-        "Mt. Giner Italy": "Monte Giner, Italy",
-        "Mt. Argentari Italy": "Monte Argentario, Italy",
-        "Wusong Jiangsu": "Wusong, China",
-        "U. S. Air Force": "",  # Remove military references
-        "Soviet": "Russia",  # Convert USSR references to modern names
-        "USSRAeroflot": "Russia",  
-        "Kiev Ukraine": "Kyiv, Ukraine",
-        "Moscow USSR": "Moscow, Russia",
-    }
-
-    for old, new in location_corrections.items():
-        location = location.replace(old, new)
-
-    # If location starts with "Near" or "Off", provide an alternative city instead of just removing
-    near_replacements = {
-        "Off Barnegat New": "Barnegat, New Jersey, USA",
-        "Off Townsville Australia": "Townsville, Queensland, Australia",
-        "Off Trapani Italy": "Trapani, Sicily, Italy",
-        "Off Gozo Malta": "Gozo, Malta",
-        "Off Folkestone England": "Folkestone, England, UK",
-    }
-
-    for old, new in near_replacements.items():
-        if old in location:
-            location = new
-
-    # Standardize "Mt." to "Mount"
-    location = re.sub(r"\bMt\.\s*", "Mount ", location)
-
-    # Remove excessive spaces
-    location = re.sub(r"\s+", " ", location).strip()
-
-    return location
+    return default_normalizer().normalize(location)
 
 
 
 def save_cleaned_data(df, output_file):
     """
-    Saves the cleaned DataFrame to a CSV file.
+    Saves the cleaned DataFrame as Parquet (dtypes kept, read back by the
+    next stages) plus a CSV copy.
 
     Args:
         df (DataFrame): Cleaned dataset.
-        output_file (str): Path to save the CSV file.
+        output_file (str): Path to save the CSV file; the Parquet file goes
+            next to it with a .parquet extension.
     """
     output_dir = os.path.dirname(output_file)
 
@@ -203,45 +215,78 @@ def save_cleaned_data(df, output_file):
         os.makedirs(output_dir)
         print(f"Created directory: {output_dir}")
 
-    df.to_csv(output_file, index=False, encoding="utf-8")
+    write_table(df, columnar_path(output_file), csv=output_file)
     print(f"Data saved successfully: {output_file}")
 
 
 
-cache_file = os.path.join(os.path.dirname(__file__), "geolocation_cachefile.csv")
+def load_geolocation_cache():
+    """
+    Opens the geocoding cache shared with pipeline.py (SQLite, WAL mode).
+    The old CSV and JSON caches are imported the first time they are seen.
+    Set GEOCACHE_TTL_DAYS to let old results expire.
+    """
+    ttl_days = os.environ.get("GEOCACHE_TTL_DAYS")
+    cache = open_cache(ttl=float(ttl_days) * 24 * 3600 if ttl_days else None)
+    print(f"Loaded {len(cache)} cached locations.")
+    return cache
 
 
+_geolocation_cache = None
 
 
-def load_geolocation_cache():
+def get_geolocation_cache():
     """
-    Loads the geolocation cache from a CSV file.
-    Ensures the cache is valid and contains the necessary columns.
+    Returns the shared geocoding cache, opened on first use (not at import).
     """
-    if not os.path.exists(cache_file):
-        print("No existing geolocation cache found. Starting fresh.")
-        return {}
+    global _geolocation_cache
+    if _geolocation_cache is None:
+        _geolocation_cache = load_geolocation_cache()
+    return _geolocation_cache
 
-    try:
-        df_cache = pd.read_csv(cache_file)
 
-        required_cols = {"Location", "Latitude", "Longitude"}
-        if not required_cols.issubset(df_cache.columns):
-            raise ValueError("Cache file is missing required columns. Resetting cache.")
 
-        df_cache.set_index("Location", inplace=True)
-        cache_dict = df_cache.to_dict(orient="index")
 
-        print(f"Loaded {len(cache_dict)} cached locations.")
-        return cache_dict
+def cached_lat_lon(location):
+    """
+    Returns the cached (latitude, longitude) for a location, (None, None) if
+    it is known to fail, or None if it has to be geocoded.
+    """
+    return get_geolocation_cache().get(location)
 
-    except Exception as e:
-        print(f"Error loading cache: {e}. Creating a fresh cache.")
-        return {}
 
-geolocation_cache = load_geolocation_cache()
+def remember_lat_lon(location, lat, lon):
+    """
+    Adds a new geocoding result to the cache (called from geocoding workers).
+    Each insert is committed on its own, so nothing is lost on interruption.
+    """
+    get_geolocation_cache().put(location, lat, lon)
 
 
+def make_scheduler(max_retries=5):
+    """
+    Builds the geocoding scheduler. Settings come from the environment:
+    GEOCODER_DOMAIN / GEOCODER_SCHEME to use another Nominatim server (e.g. a
+    local stand-in), GEOCODER_RATE (requests/s, default 1) and
+    GEOCODER_WORKERS (default 4). When an offline gazetteer is available
+    (AIRCRASH_GAZETTEER), it is tried before the network.
+    """
+    backend = NominatimBackend(
+        user_agent="air_crash_locator",
+        domain=os.environ.get("GEOCODER_DOMAIN"),
+        scheme=os.environ.get("GEOCODER_SCHEME"),
+    )
+    return GeocodeScheduler(
+        backend,
+        lookup=cached_lat_lon,
+        store=remember_lat_lon,
+        store_miss=get_geolocation_cache().put_miss,
+        local=load_default_gazetteer(),
+        rate=float(os.environ.get("GEOCODER_RATE", 1)),
+        workers=int(os.environ.get("GEOCODER_WORKERS", 4)),
+        fallback=clean_location_string,
+        max_retries=max_retries,
+    )
 
 
 def get_lat_lon(location, max_retries=5):
@@ -259,69 +304,22 @@ def get_lat_lon(location, max_retries=5):
     if not location or pd.isna(location):
         return None, None
 
-    # Check if already cached
-    if location in geolocation_cache and geolocation_cache[location]["Latitude"] is not None:
-        return geolocation_cache[location]['Latitude'], geolocation_cache[location]['Longitude']
-
-    geolocator = Nominatim(user_agent="air_crash_locator")
-
-    # Try full location first
-    for attempt in range(max_retries):
-        try:
-            loc = geolocator.geocode(location, timeout=10)
-            if loc:
-                geolocation_cache[location] = {"Latitude": loc.latitude, "Longitude": loc.longitude}
-                save_geolocation_cache()
-                return loc.latitude, loc.longitude
-
-        except GeocoderTimedOut:
-            print(f"Timeout while fetching '{location}', retrying ({attempt + 1}/{max_retries})...")
-            time.sleep(2 ** attempt)
-
-    # If full location fails, try broader location (remove details)
-    broader_location = clean_location_string(location)
-    if broader_location and broader_location != location:
-        print(f"Retrying with a broader location: {broader_location}")
-        for attempt in range(max_retries):
-            try:
-                loc = geolocator.geocode(broader_location, timeout=10)
-                if loc:
-                    geolocation_cache[location] = {"Latitude": loc.latitude, "Longitude": loc.longitude}
-                    save_geolocation_cache()
-                    return loc.latitude, loc.longitude
-            except GeocoderTimedOut:
-                time.sleep(2 ** attempt)
-
-    print(f" Warning: No coordinates found for '{location}', even after fallback.")
-    return None, None
+    return make_scheduler(max_retries).resolve([location])[location]
 
 
 
 
 def save_geolocation_cache():
     """
-    Saves the geolocation cache to a CSV file safely.
-    Uses a temporary file to prevent corruption.
+    Compacts the geolocation cache: folds the write-ahead log into the
+    database file. Entries are already saved as they are inserted.
     """
-    if not geolocation_cache:
-        print("No new geolocation data to save.")
-        return  
-
-    df_cache = pd.DataFrame.from_dict(geolocation_cache, orient="index").reset_index()
-    df_cache.rename(columns={"index": "Location"}, inplace=True)
-
-    temp_file = cache_file + ".tmp"
-
     try:
-        print(f"Saving {len(geolocation_cache)} locations to cache...")
-        df_cache.to_csv(temp_file, index=False, encoding="utf-8")
-
-        # Ensure the temp file replaces the original
-        shutil.move(temp_file, cache_file)
-        print("Cache successfully updated.")
-
+        cache = get_geolocation_cache()
+        cache.checkpoint()
+        print(f"Cache holds {len(cache)} locations.")
     except Exception as e:
-        print(f"Error saving cache: {e}")
+        print(f"Error compacting cache: {e}")
 
 
 
@@ -342,66 +340,72 @@ def add_geolocation(df):
 
     print("Fetching latitude and longitude for crash locations...")
 
-    latitudes, longitudes = [], []
+    coords = batch_geocode(df["Location"])
+    df["Latitude"] = coords["Latitude"]
+    df["Longitude"] = coords["Longitude"]
 
-    for idx, loc in enumerate(df["Location"]):
-        if pd.notnull(loc) and loc.strip() != "":
-            #  Clean the location string before searching
-            cleaned_location = clean_location_string(loc)
+    save_geolocation_cache()
+    print("All locations processed and saved.")
+
+    return df
 
-            #  Use cached value if available
-            if cleaned_location in geolocation_cache and geolocation_cache[cleaned_location]["Latitude"] is not None:
-                lat, lon = geolocation_cache[cleaned_location]["Latitude"], geolocation_cache[cleaned_location]["Longitude"]
-            else:
-                lat, lon = get_lat_lon(cleaned_location)
 
-                #  Only save valid coordinates
-                if lat is not None and lon is not None:
-                    geolocation_cache[cleaned_location] = {"Latitude": lat, "Longitude": lon}
-                    save_geolocation_cache()
+def batch_geocode(locations):
+    """
+    Geocodes a column of location strings, once per distinct location.
 
-            latitudes.append(lat)
-            longitudes.append(lon)
+    Distinct non-empty locations are cleaned with the location normalizer,
+    each distinct cleaned query is resolved once (cache first, then the
+    geocoder), and the coordinates are joined back onto every row.
 
-            if idx % 50 == 0:
-                save_geolocation_cache()
-                print(f"Saved progress at {idx} locations.")
+    Args:
+        locations (Series): Raw location strings.
 
-            time.sleep(1)  # Avoid API rate limits
-        else:
-            latitudes.append(None)
-            longitudes.append(None)
+    Returns:
+        DataFrame: 'Latitude' and 'Longitude', aligned with `locations`.
+    """
+    unique = pd.Series(locations.dropna().unique())
+    unique = unique[unique.str.strip() != ""]
 
-    df["Latitude"] = latitudes
-    df["Longitude"] = longitudes
+    #  Clean the location strings before searching
+    keys = pd.DataFrame({"Location": unique, "query": default_normalizer().normalize_series(unique)})
+    print(f"{len(locations)} rows, {len(keys)} distinct locations, {keys['query'].nunique()} distinct queries.")
 
-    save_geolocation_cache()
-    print("All locations processed and saved.")
+    # Cache hits come back immediately; only misses are rate-limited
+    coords = make_scheduler().resolve(keys["query"])
+    coords = pd.DataFrame.from_dict(coords, orient="index", columns=["Latitude", "Longitude"])
 
-    return df
+    keys = keys.join(coords, on="query").set_index("Location")[["Latitude", "Longitude"]]
+    return locations.to_frame("Location").join(keys, on="Location")[["Latitude", "Longitude"]]
 
 
-def clean_aircrash_data():
+RAW_FILE = 'aircrashesFullDataUpdated_2024.csv'
+CLEANED_FILE = os.path.abspath(os.path.join(os.path.dirname(__file__), '../data/processed/cleaned_aircrashes.csv'))
+
+
+def clean_aircrash_data(file_name=RAW_FILE, output_file=CLEANED_FILE, geocode=True):
     """
     Executes the full pipeline: Load → Clean → Geolocation → Save
     """
-    file_name = 'aircrashesFullDataUpdated_2024.csv'
-    output_file = '../data/processed/cleaned_aircrashes.csv'
-
     df = load_data(file_name)
     if df is not None:
-        cleaned_df = clean_data(df)              
-        cleaned_df = add_geolocation(cleaned_df)
+        cleaned_df = clean_data(df)
+        if geocode:
+            cleaned_df = add_geolocation(cleaned_df)
         save_cleaned_data(cleaned_df, output_file)
+        return cleaned_df
+    return None
+
 
+def geocode_cleaned_data(input_file=CLEANED_FILE, output_file=CLEANED_FILE):
+    """
+    Adds coordinates to an already cleaned table and saves it.
+    """
+    df = read_table(input_file)
+    df = add_geolocation(df)
+    save_cleaned_data(df, output_file)
+    return df
 
 
 if __name__ == "__main__":
-    file_name = 'aircrashesFullDataUpdated_2024.csv'
-    output_file = '../data/processed/cleaned_aircrashes.csv'
-    
-    df = load_data(file_name)
-    if df is not None:
-        cleaned_df = clean_data(df)
-        cleaned_df = add_geolocation(cleaned_df)
-        save_cleaned_data(cleaned_df, output_file)
+    clean_aircrash_data()
@@ -0,0 +1,282 @@
+"""
+Offline gazetteer geocoder.
+
+Loads a place-name file into memory and answers `geocode(query)` without any
+network access, so it can be the first tier in front of Nominatim (and the
+only one on air-gapped runners). Supported files:
+
+- GeoNames dumps (cities15000.txt, allCountries.txt, ...): tab-separated,
+  no header; alternate names are indexed too.
+- Natural Earth populated places (ne_*_populated_places*.shp).
+- Any CSV with name, latitude, longitude and optionally country and
+  population columns.
+
+Names are normalized (accents, case, punctuation) into a hash index. A
+trigram index over the same names catches misspellings. When a name has
+several matches, the most populous place wins, restricted to the country
+given after the last comma ("Delhi, India") or, without a comma, in the
+last one to three words ("Zurich Switzerland", the dataset's format). A
+part after the last comma that is not a country ("Paris, Texas") gives no
+answer rather than a same-named place elsewhere.
+
+The file is picked from AIRCRASH_GAZETTEER, or data/gazetteer/cities15000.txt
+when it exists.
+"""
+import csv
+import functools
+import math
+import os
+import re
+import unicodedata
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DEFAULT_GAZETTEER = os.path.join(BASE_DIR, "data", "gazetteer", "cities15000.txt")
+
+# https://download.geonames.org/export/dump/readme.txt
+GEONAMES_COLUMNS = [
+    "geonameid", "name", "asciiname", "alternatenames", "latitude", "longitude",
+    "feature_class", "feature_code", "country_code", "cc2", "admin1_code",
+    "admin2_code", "admin3_code", "admin4_code", "population", "elevation",
+    "dem", "timezone", "modification_date",
+]
+
+FUZZY_CUTOFF = 0.6   # minimum trigram similarity for a fuzzy match
+
+
+def normalize_place(name):
+    """
+    Lowercases, strips accents and punctuation: "São Paulo" -> "sao paulo".
+    """
+    text = unicodedata.normalize("NFKD", str(name))
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.sub(r"[^0-9a-z]+", " ", text.lower()).strip()
+
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _country_names(code):
+    """
+    Normalized names a country can be referred to by, from its ISO alpha-2 code.
+    """
+    names = {normalize_place(code)}
+    try:
+        import pycountry
+
+        country = pycountry.countries.get(alpha_2=code)
+    except ImportError:
+        return names
+    if country is None:
+        return names
+
+    for attr in ("name", "official_name", "common_name", "alpha_3"):
+        if hasattr(country, attr):
+            names.add(normalize_place(getattr(country, attr)))
+    try:
+        from country_resolver import HISTORIC_NAMES
+    except ImportError:
+        return names
+    # Short and former names pycountry lacks: "Russia", "England", "Burma", ...
+    names.update(normalize_place(name) for name, iso in HISTORIC_NAMES.items() if iso == country.alpha_3)
+    return names
+
+
+class Gazetteer:
+    """
+    In-memory place-name index.
+
+    Args:
+        places (DataFrame): One row per place with name, latitude, longitude,
+            country and population; an optional 'alternatenames' column holds
+            comma-separated extra names.
+    """
+
+    def __init__(self, places):
+        places = places.sort_values("population", ascending=False, kind="stable").reset_index(drop=True)
+        self.lat = places["latitude"].to_numpy(dtype=float)
+        self.lon = places["longitude"].to_numpy(dtype=float)
+        self.country = places["country"].fillna("").astype(str).to_numpy()
+
+        # normalized name -> place ids, most populous first (rows are sorted)
+        self.index = defaultdict(list)
+        alternates = places["alternatenames"] if "alternatenames" in places else None
+        for i, name in enumerate(places["name"]):
+            names = {normalize_place(name)}
+            if alternates is not None and isinstance(alternates.iat[i], str):
+                names.update(normalize_place(n) for n in alternates.iat[i].split(","))
+            for key in names:
+                if key:
+                    self.index[key].append(i)
+
+        self.keys = list(self.index)
+        grams = defaultdict(list)
+        gram_counts = np.empty(len(self.keys), dtype=np.int32)
+        for k, key in enumerate(self.keys):
+            key_grams = _trigrams(key)
+            gram_counts[k] = len(key_grams)
+            for gram in key_grams:
+                grams[gram].append(k)
+        # trigram -> sorted key ids, and the number of trigrams of each key
+        self.grams = {gram: np.array(ids, dtype=np.int32) for gram, ids in grams.items()}
+        self.gram_counts = gram_counts
+
+        # country hint (normalized) -> set of country values used in `places`
+        self.country_aliases = defaultdict(set)
+        for value in set(self.country):
+            aliases = _country_names(value) if len(value) == 2 else {normalize_place(value)}
+            for alias in aliases:
+                self.country_aliases[alias].add(value)
+
+        print(f"Gazetteer ready: {len(places)} places, {len(self.keys)} names.")
+
+    def __len__(self):
+        return len(self.lat)
+
+    @classmethod
+    def from_geonames(cls, path):
+        places = pd.read_csv(
+            path, sep="\t", header=None, names=GEONAMES_COLUMNS, quoting=csv.QUOTE_NONE,
+            usecols=["name", "alternatenames", "latitude", "longitude", "country_code", "population"],
+            dtype={"country_code": str}, keep_default_na=False, na_values=[""],
+        )
+        return cls(places.rename(columns={"country_code": "country"}))
+
+    @classmethod
+    def from_natural_earth(cls, path):
+        import geopandas as gpd
+
+        gdf = gpd.read_file(path)
+        cols = {c.upper(): c for c in gdf.columns}
+        places = pd.DataFrame({
+            "name": gdf[cols["NAME"]],
+            "alternatenames": gdf[cols["NAMEASCII"]] if "NAMEASCII" in cols else None,
+            "latitude": gdf.geometry.y,
+            "longitude": gdf.geometry.x,
+            "country": gdf[cols["ADM0NAME"]] if "ADM0NAME" in cols else "",
+            "population": gdf[cols["POP_MAX"]] if "POP_MAX" in cols else 0,
+        })
+        return cls(places)
+
+    @classmethod
+    def from_csv(cls, path):
+        places = pd.read_csv(path)
+        places.columns = [c.lower() for c in places.columns]
+        places = places.rename(columns={"lat": "latitude", "lon": "longitude", "lng": "longitude"})
+        if "country" not in places:
+            places["country"] = ""
+        if "population" not in places:
+            places["population"] = 0
+        return cls(places)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads a gazetteer file, choosing the reader from its extension.
+        """
+        ext = os.path.splitext(path)[1].lower()
+        if ext in (".shp", ".gpkg", ".geojson"):
+            return cls.from_natural_earth(path)
+        if ext == ".csv":
+            return cls.from_csv(path)
+        return cls.from_geonames(path)
+
+    def _pick(self, ids, countries):
+        for i in ids:
+            if countries is None or self.country[i] in countries:
+                return i
+        return None
+
+    def _fuzzy(self, name, countries):
+        query_grams = _trigrams(name)
+        n_query = len(query_grams)
+        # Jaccard >= FUZZY_CUTOFF needs at least this many shared trigrams
+        min_shared = math.ceil(FUZZY_CUTOFF * n_query)
+        postings = sorted((self.grams[g] for g in query_grams if g in self.grams), key=len)
+        if len(postings) < min_shared:
+            return None
+
+        # A key sharing min_shared trigrams has at least one among the rarest
+        # len - min_shared + 1, so only those lists give candidates
+        candidates = np.unique(np.concatenate(postings[:len(postings) - min_shared + 1]))
+        n_key = self.gram_counts[candidates]
+        keep = (n_key >= FUZZY_CUTOFF * n_query) & (n_key * FUZZY_CUTOFF <= n_query)
+        candidates, n_key = candidates[keep], n_key[keep]
+
+        shared = np.zeros(len(candidates), dtype=np.int32)
+        for ids in postings:
+            pos = np.minimum(np.searchsorted(ids, candidates), len(ids) - 1)
+            shared += ids[pos] == candidates
+        scores = shared / (n_query + n_key - shared)   # Jaccard similarity
+
+        best, best_score = None, FUZZY_CUTOFF
+        for k, score in zip(candidates.tolist(), scores.tolist()):
+            if score >= best_score:
+                i = self._pick(self.index[self.keys[k]], countries)
+                if i is not None and (score > best_score or best is None or i < best):
+                    best, best_score = i, score
+        return best
+
+    def _country_hint(self, text):
+        """
+        Splits "zurich switzerland" into ("zurich", country values) when the
+        last one to three words name a country; (text, None) otherwise.
+        """
+        words = text.split()
+        for n in (3, 2, 1):
+            hint = " ".join(words[-n:])
+            # Full names only: as plain words, codes like "de" or "can" aren't countries
+            if len(words) > n and len(hint) > 3 and hint in self.country_aliases:
+                return " ".join(words[:-n]), self.country_aliases[hint]
+        return text, None
+
+    def lookup(self, query, fuzzy=True):
+        """
+        Returns the id of the best place for `query`, or None.
+        """
+        parts = [normalize_place(p) for p in str(query).split(",")]
+        parts = [p for p in parts if p]
+        if not parts:
+            return None
+
+        if len(parts) > 1:
+            # A region the index can't check ("Paris, Texas"): better no
+            # answer than the Paris in France
+            countries = self.country_aliases.get(parts[-1])
+            if countries is None:
+                return None
+            parts = parts[:-1]
+        else:
+            name, countries = self._country_hint(parts[0])
+            parts = [name]
+
+        # Most specific part first: "Kainantu, Eastern Highlands, Papua New Guinea"
+        for part in [" ".join(parts)] + parts:
+            i = self._pick(self.index.get(part, ()), countries)
+            if i is not None:
+                return i
+
+        return self._fuzzy(parts[0], countries) if fuzzy else None
+
+    def geocode(self, query):
+        """
+        Returns (latitude, longitude) for a location string, or None.
+        """
+        i = self.lookup(query)
+        return None if i is None else (float(self.lat[i]), float(self.lon[i]))
+
+
+@functools.lru_cache(maxsize=1)
+def load_default_gazetteer():
+    """
+    Returns the configured gazetteer, or None when no file is available.
+    """
+    path = os.environ.get("AIRCRASH_GAZETTEER", DEFAULT_GAZETTEER)
+    if not os.path.exists(path):
+        return None
+    return Gazetteer.load(path)
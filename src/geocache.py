@@ -0,0 +1,212 @@
+"""
+Persistent geocoding cache backed by SQLite in WAL mode, shared by
+data_cleaning.py and pipeline.py.
+
+Entries are keyed by the exact query text sent to the geocoder. Every insert
+is one small transaction, so adding an entry costs the same whatever the
+size of the cache, and a run interrupted halfway keeps every result
+committed so far. WAL mode lets several processes read and write the same
+file at once (writers queue on a short lock instead of failing), which
+replaces the old lock-file workaround in data_cleaning.py.
+
+Failed lookups are cached too, with a retry-after time, so queries known to
+fail cost no network call until then. An optional TTL makes old positive
+results expire.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DEFAULT_DB = os.path.join(BASE_DIR, "data", "geocache.sqlite")
+
+# Caches used before this module existed, imported once into DEFAULT_DB
+LEGACY_CSV = os.path.join(BASE_DIR, "src", "geolocation_cachefile.csv")
+LEGACY_JSON = os.path.join(BASE_DIR, "data", "processed", "geo_cache.json")
+ARCHIVE_JSON = os.path.join(BASE_DIR, "data", "_archive", "geo_cache.json")   # where the old pipeline cache now lives
+LEGACY_SOURCES = (LEGACY_CSV, LEGACY_JSON, ARCHIVE_JSON)
+
+NEGATIVE_RETRY_SECONDS = 30 * 24 * 3600   # retry failed queries after 30 days
+
+HIT, MISS = "hit", "miss"
+
+
+class GeoCache:
+    """
+    Location query -> (latitude, longitude) store.
+
+    Args:
+        path (str): SQLite database file, created if missing.
+        ttl (float): Age in seconds after which positive results are
+            ignored and evicted. None keeps them forever.
+    """
+
+    def __init__(self, path, ttl=None):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS geocache ("
+            " query TEXT PRIMARY KEY,"
+            " latitude REAL,"
+            " longitude REAL,"
+            " updated_at REAL)"
+        )
+        # Columns added for negative caching; older databases get them here
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(geocache)")}
+        if "status" not in columns:
+            conn.execute(f"ALTER TABLE geocache ADD COLUMN status TEXT NOT NULL DEFAULT '{HIT}'")
+        if "retry_after" not in columns:
+            conn.execute("ALTER TABLE geocache ADD COLUMN retry_after REAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS imports (source TEXT PRIMARY KEY, imported_at REAL)")
+
+    def _conn(self):
+        # One connection per thread: sqlite3 connections must not be shared
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, query):
+        """
+        Returns (latitude, longitude) for a cached hit, (None, None) for a
+        query known to fail whose retry time hasn't come yet, or None when
+        the query has to be geocoded.
+        """
+        row = self._conn().execute(
+            "SELECT latitude, longitude, status, updated_at, retry_after FROM geocache WHERE query = ?",
+            (query,),
+        ).fetchone()
+        if row is None:
+            return None
+
+        lat, lon, status, updated_at, retry_after = row
+        now = time.time()
+        if status == MISS:
+            return (None, None) if retry_after and retry_after > now else None
+        if lat is None or (self.ttl and updated_at and now - updated_at > self.ttl):
+            return None
+        return lat, lon
+
+    def put(self, query, lat, lon):
+        """
+        Stores one result; committed (and safe from interruption) on return.
+        """
+        self._conn().execute(
+            "INSERT OR REPLACE INTO geocache (query, latitude, longitude, updated_at, status, retry_after)"
+            " VALUES (?, ?, ?, ?, ?, NULL)",
+            (query, lat, lon, time.time(), HIT),
+        )
+
+    def put_miss(self, query, retry_seconds=NEGATIVE_RETRY_SECONDS):
+        """
+        Records that a query found nothing; it won't be retried for `retry_seconds`.
+        """
+        now = time.time()
+        self._conn().execute(
+            "INSERT OR REPLACE INTO geocache (query, latitude, longitude, updated_at, status, retry_after)"
+            " VALUES (?, NULL, NULL, ?, ?, ?)",
+            (query, now, MISS, now + retry_seconds),
+        )
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM geocache").fetchone()[0]
+
+    def evict(self):
+        """
+        Deletes expired entries: hits older than the TTL and misses whose
+        retry time has passed.
+
+        Returns:
+            int: Number of entries removed.
+        """
+        now = time.time()
+        conn = self._conn()
+        removed = conn.execute(
+            "DELETE FROM geocache WHERE status = ? AND retry_after <= ?", (MISS, now)
+        ).rowcount
+        if self.ttl:
+            removed += conn.execute(
+                "DELETE FROM geocache WHERE status = ? AND updated_at < ?", (HIT, now - self.ttl)
+            ).rowcount
+        return removed
+
+    def _import_rows(self, source, rows):
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN")
+            conn.executemany(
+                "INSERT OR IGNORE INTO geocache (query, latitude, longitude, updated_at, status)"
+                " VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute("INSERT OR REPLACE INTO imports VALUES (?, ?)", (source, time.time()))
+        print(f"Imported {len(rows)} cached locations from {source}.")
+
+    def imported(self, source):
+        return self._conn().execute("SELECT 1 FROM imports WHERE source = ?", (source,)).fetchone() is not None
+
+    def import_csv(self, csv_path):
+        """
+        Imports a data_cleaning CSV cache (Location, Latitude, Longitude).
+        Entries already in the database are kept.
+        """
+        df = pd.read_csv(csv_path).dropna(subset=["Location", "Latitude", "Longitude"])
+        now = time.time()
+        rows = [
+            (loc, lat, lon, now, HIT)
+            for loc, lat, lon in df[["Location", "Latitude", "Longitude"]].itertuples(index=False)
+        ]
+        self._import_rows(csv_path, rows)
+
+    def import_json(self, json_path):
+        """
+        Imports a pipeline.py JSON cache ({query: [lat, lon]}).
+        Entries already in the database are kept.
+        """
+        with open(json_path, encoding="utf-8") as f:
+            data = json.load(f)
+        now = time.time()
+        rows = [(query, hit[0], hit[1], now, HIT) for query, hit in data.items() if hit]
+        self._import_rows(json_path, rows)
+
+    def checkpoint(self):
+        """
+        Folds the write-ahead log back into the main database file.
+        """
+        self._conn().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def to_frame(self):
+        """
+        Returns the cached hits as a DataFrame, e.g. for a CSV export.
+        """
+        return pd.read_sql_query(
+            "SELECT query AS Location, latitude AS Latitude, longitude AS Longitude"
+            " FROM geocache WHERE status = 'hit'",
+            self._conn(),
+        )
+
+
+def open_cache(path=DEFAULT_DB, legacy_sources=LEGACY_SOURCES, ttl=None):
+    """
+    Opens the shared cache, importing each legacy cache file the first time
+    it is seen, and drops expired entries.
+    """
+    cache = GeoCache(path, ttl=ttl)
+    for source in legacy_sources:
+        if os.path.exists(source) and not cache.imported(source):
+            if source.endswith(".json"):
+                cache.import_json(source)
+            else:
+                cache.import_csv(source)
+    cache.evict()
+    return cache
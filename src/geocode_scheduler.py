@@ -0,0 +1,165 @@
+"""
+Concurrent, rate-limited geocoding.
+
+Cache hits (including queries cached as known failures) are answered
+straight away with no delay. Only cache misses go
+to the geocoding backend, through a small worker pool that shares one token
+bucket, so the provider never sees more than `rate` requests per second
+(Nominatim's fair-use policy is 1 req/s).
+
+An optional local backend (e.g. the offline gazetteer) is tried before the
+network, without rate limiting; only what it can't resolve is sent on.
+
+A backend is any object with a `geocode(query)` method returning
+(latitude, longitude) or None. Point NominatimBackend at a local stand-in
+server with domain="localhost:8080", scheme="http" to test without the
+public API.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, up to `capacity`.
+    """
+
+    def __init__(self, rate=1.0, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Blocks until a token is available, then takes it.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class NominatimBackend:
+    """
+    Geocodes through a Nominatim server (the public OpenStreetMap one by default).
+    """
+
+    def __init__(self, user_agent="air_crash_locator", domain=None, scheme=None, timeout=10):
+        from geopy.geocoders import Nominatim
+
+        options = {"user_agent": user_agent, "timeout": timeout}
+        if domain:
+            options["domain"] = domain
+        if scheme:
+            options["scheme"] = scheme
+        self.geocoder = Nominatim(**options)
+
+    def geocode(self, query):
+        loc = self.geocoder.geocode(query, exactly_one=True)
+        return (loc.latitude, loc.longitude) if loc else None
+
+
+class GeocodeScheduler:
+    """
+    Resolves batches of location queries through a cache and a backend.
+
+    Args:
+        backend: Object with `geocode(query) -> (lat, lon) | None`.
+        lookup (callable): Returns cached (lat, lon) for a query, or None.
+        store (callable): Called as store(query, lat, lon) for every new hit.
+        store_miss (callable): Optional, called as store_miss(query) when a
+            query definitely found nothing (not on timeouts or errors).
+        local: Optional offline backend tried first, outside the rate limit.
+        rate (float): Backend requests per second, shared by all workers.
+        workers (int): Number of concurrent backend requests.
+        fallback (callable): Optional query -> broader query, tried when the
+            full query finds nothing.
+        max_retries (int): Attempts per query on timeouts and service errors.
+    """
+
+    def __init__(self, backend, lookup, store, store_miss=None, local=None, rate=1.0, workers=4,
+                 fallback=None, max_retries=5):
+        self.backend = backend
+        self.local = local
+        self.lookup = lookup
+        self.store = store
+        self.store_miss = store_miss
+        self.bucket = TokenBucket(rate)
+        self.workers = workers
+        self.fallback = fallback
+        self.max_retries = max_retries
+
+    def _geocode(self, query):
+        """
+        Returns (hit, failed): the backend's answer, and whether every attempt
+        ended in a timeout or service error.
+        """
+        from geopy.exc import GeocoderServiceError, GeocoderTimedOut
+
+        for attempt in range(self.max_retries):
+            self.bucket.acquire()
+            try:
+                return self.backend.geocode(query), False
+            except (GeocoderTimedOut, GeocoderServiceError) as e:
+                print(f"{type(e).__name__} while fetching '{query}', retrying ({attempt + 1}/{self.max_retries})...")
+                time.sleep(2 ** attempt)
+        return None, True
+
+    def _fetch(self, query):
+        hit, failed = self._geocode(query)
+
+        # If the full location fails, try a broader one
+        if hit is None and self.fallback is not None:
+            broader = self.fallback(query)
+            if broader and broader != query:
+                hit, broader_failed = self._geocode(broader)
+                failed = failed or broader_failed
+
+        if hit is None:
+            print(f" Warning: No coordinates found for '{query}', even after fallback.")
+            # Only a real "not found" is worth remembering; errors may be transient
+            if not failed and self.store_miss is not None:
+                self.store_miss(query)
+            return None, None
+        self.store(query, *hit)
+        return hit
+
+    def resolve(self, queries):
+        """
+        Returns {query: (lat, lon)} for the distinct non-empty queries, with
+        (None, None) for the ones that could not be geocoded.
+        """
+        results, misses = {}, []
+        for query in dict.fromkeys(q for q in queries if q):
+            cached = self.lookup(query)
+            if cached is not None:
+                results[query] = cached
+            else:
+                misses.append(query)
+
+        if misses and self.local is not None:
+            remaining = []
+            for query in misses:
+                hit = self.local.geocode(query)
+                if hit is not None:
+                    results[query] = hit
+                else:
+                    remaining.append(query)
+            print(f"Offline gazetteer resolved {len(misses) - len(remaining)} of {len(misses)} uncached locations.")
+            misses = remaining
+
+        if misses:
+            print(f"{len(results)} locations resolved locally, geocoding {len(misses)} with {self.workers} workers...")
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                for query, hit in zip(misses, pool.map(self._fetch, misses)):
+                    results[query] = hit
+        return results
@@ -0,0 +1,143 @@
+"""
+Location string normalizer used to build geocoding queries.
+
+The correction tables live in data/location_corrections.json:
+
+- "corrections": substrings replaced in place (outdated country names,
+  typos, military references to drop...).
+- "near_replacements": when the location contains one of these, the whole
+  string is replaced ("Off Gozo Malta ..." -> "Gozo, Malta").
+
+Both tables are applied in file order, exactly like the original chain of
+str.replace calls: a correction can undo or feed a later one ("Moscow
+USSRAeroflot" loses "USSRAeroflot" before "Moscow USSR" is looked for), and
+the last matching near replacement wins. Each table is also compiled into a
+single regex (a trie of the keys) that only tells whether any key occurs,
+so most locations skip the loop entirely. Results are memoized, so a column
+with many repeated locations is normalized once per distinct value.
+
+scripts/check_normalizer.py compares the output with the original
+implementation on every distinct location of the raw dataset.
+"""
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+CORRECTIONS_FILE = os.path.join(BASE_DIR, "data", "location_corrections.json")
+
+# "950 nm S of", "50 km N of", ...
+DISTANCE_RE = re.compile(r"\d+\s*(nm|km|miles)?\s*[NSEW]\s*of\s*", re.IGNORECASE)
+MOUNT_RE = re.compile(r"\bMt\.\s*")
+SPACES_RE = re.compile(r"\s+")
+
+
+def _trie_pattern(words):
+    """
+    Builds one regex matching any of `words`, longest first, as a
+    character trie: "Moscow USSR|Mt. Giner" -> "(?:Mo...|Mt...)".
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def build(node):
+        end = "" in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # Greedy optional branch, so the longest key wins
+        return f"(?:{body})?" if end else body
+
+    return build(trie)
+
+
+def _compile(table):
+    return re.compile(_trie_pattern(table)) if table else None
+
+
+class LocationNormalizer:
+    """
+    Turns raw crash locations into broader geocoding queries.
+
+    Args:
+        corrections (dict): Substring -> replacement.
+        near_replacements (dict): Substring -> replacement for the whole location.
+    """
+
+    def __init__(self, corrections=None, near_replacements=None):
+        self.corrections = dict(corrections or {})
+        self.near_replacements = dict(near_replacements or {})
+        self._corrections_re = _compile(self.corrections)
+        self._near_re = _compile(self.near_replacements)
+        self._memo = {}
+
+    @classmethod
+    def from_file(cls, path=CORRECTIONS_FILE):
+        """
+        Loads the correction tables from a JSON file.
+        """
+        with open(path, encoding="utf-8") as f:
+            tables = json.load(f)
+        return cls(tables.get("corrections"), tables.get("near_replacements"))
+
+    def _normalize(self, location):
+        # Remove distance markers like "950 nm S of", "50 km N of"
+        location = DISTANCE_RE.sub("", location)
+
+        # Replace outdated country names with modern equivalents, in order
+        if self._corrections_re is not None and self._corrections_re.search(location):
+            for old, new in self.corrections.items():
+                location = location.replace(old, new)
+
+        # If location starts with "Near" or "Off", provide an alternative city instead of just removing
+        if self._near_re is not None and self._near_re.search(location):
+            for old, new in self.near_replacements.items():
+                if old in location:
+                    location = new
+
+        # Standardize "Mt." to "Mount", remove excessive spaces
+        location = MOUNT_RE.sub("Mount ", location)
+        return SPACES_RE.sub(" ", location).strip()
+
+    def normalize(self, location):
+        """
+        Normalizes one location string (memoized).
+        """
+        result = self._memo.get(location)
+        if result is None:
+            result = self._memo[location] = self._normalize(location)
+        return result
+
+    def normalize_series(self, locations):
+        """
+        Normalizes a Series of locations, once per distinct value. Missing
+        values stay missing.
+
+        Returns:
+            Series: Same index as `locations`.
+        """
+        codes, uniques = pd.factorize(locations)
+        cleaned = np.array([self.normalize(str(u)) for u in uniques] + [None], dtype=object)
+        return pd.Series(cleaned[codes], index=locations.index, name=locations.name)
+
+
+_default = None
+
+
+def default_normalizer():
+    """
+    Returns the normalizer built from data/location_corrections.json,
+    loaded on first use.
+    """
+    global _default
+    if _default is None:
+        _default = LocationNormalizer.from_file()
+    return _default
@@ -2,12 +2,13 @@
 # -*- coding: utf-8 -*-
 # pipeline.py – valide & corrige les coordonnées (lat, lon)
 
-import pandas as pd, geopandas as gpd, pycountry
-from shapely.geometry import Point
-from rapidfuzz import process, fuzz
-from geopy.geocoders import Nominatim
+# Rien n'est exécuté à l'import : tout se passe dans main(). Les bibliothèques
+# lourdes (geopandas, geopy, rapidfuzz…) ne sont importées que là où elles servent.
+import pandas as pd
 from pathlib import Path
-import json, time, requests, zipfile, io, sys
+import time, sys, json, os, shutil
+
+from storage import columnar_path, read_table, write_table
 
 # -------------------------------------------------------------------
 # RÉPERTOIRES / FICHIERS (toujours relatifs à la racine du projet)
@@ -15,35 +16,21 @@ BASE_DIR = Path(__file__).resolve().parent.parent     # …/air-crashes-analysis
 DATA_DIR = BASE_DIR / "data"
 PROC_DIR = DATA_DIR / "processed"
 
-RAW_CSV  = PROC_DIR / "cleaned_aircrashes_geo_final.csv"     # ← ton dernier CSV
+RAW_CSV  = PROC_DIR / "cleaned_aircrashes_geo_FINAL.csv"     # ← ton dernier CSV
 OUT_CSV  = PROC_DIR / "cleaned_aircrashes_geo_PERFECT.csv"
-CACHE    = PROC_DIR / "geo_cache.json"
-
-NE_DIR   = DATA_DIR / "ne_admin0"
-NE_SHP   = NE_DIR / "ne_110m_admin_0_countries.shp"
-NE_ZIP   = "https://naciscdn.org/naturalearth/110m/cultural/ne_110m_admin_0_countries.zip"
+OUT_PARQUET = PROC_DIR / "cleaned_aircrashes_geo_PERFECT.parquet"   # lu par les étapes suivantes
 
-# -------------------------------------------------------------------
-# VÉRIFICATIONS INITIALES
-if not RAW_CSV.exists():
-    sys.exit(f"❌ CSV introuvable : {RAW_CSV}")
+# Reprise après interruption : un fichier de corrections par lot + un manifeste
+CKPT_DIR   = PROC_DIR / "pipeline_checkpoint"
+MANIFEST   = CKPT_DIR / "manifest.json"
+BATCH_ROWS = int(os.environ.get("PIPELINE_BATCH_ROWS", 500))
 
 # -------------------------------------------------------------------
-# TÉLÉCHARGEMENT DU SHAPEFILE NATURAL EARTH (une seule fois)
-if not NE_SHP.exists():
-    print("► Téléchargement du shapefile Natural Earth…")
-    NE_DIR.mkdir(parents=True, exist_ok=True)
-    z = requests.get(NE_ZIP, timeout=30); z.raise_for_status()
-    with zipfile.ZipFile(io.BytesIO(z.content)) as f:
-        f.extractall(NE_DIR)
-    print("✔ Shapefile extrait dans", NE_DIR)
+# PAYS NATURAL EARTH : 110m, puis 50m seulement près des frontières (containment.py)
+def load_world():
+    from containment import CountryLocator
 
-world = gpd.read_file(NE_SHP)[["ISO_A3", "ADMIN", "geometry"]]
-
-# -------------------------------------------------------------------
-# CHARGEMENT DU DATASET
-df = pd.read_csv(RAW_CSV)
-print(f"Loaded {len(df):,} rows")
+    return CountryLocator.default()   # télécharge les shapefiles manquants
 
 # -------------------------------------------------------------------
 # FONCTIONS UTILITAIRES
@@ -54,59 +41,145 @@ def loc_to_country(loc: str) -> str | None:
     return parts[-1] if parts else None
 
 def country_to_iso(name: str) -> str | None:
-    if not isinstance(name, str):
-        return None
-    try:
-        return pycountry.countries.lookup(name).alpha_3
-    except LookupError:
-        all_names = [c.name for c in pycountry.countries]
-        best, score, _ = process.extractOne(name, all_names, scorer=fuzz.token_sort_ratio)
-        return pycountry.countries.get(name=best).alpha_3 if score > 80 else None
-
-def point_in_iso(lat, lon):
-    poly = world[world.contains(Point(lon, lat))]
-    return None if poly.empty else poly.iloc[0]["ISO_A3"]
+    from country_resolver import default_resolver
+
+    return default_resolver().resolve(name)   # table d'alias construite une fois, mémoïsée
+
+def points_to_iso(lat, lon, world) -> pd.Series:
+    """
+    Code ISO alpha-3 du pays contenant chaque point (None hors de tout pays / NaN).
+    `world` est le CountryLocator de load_world() : filtre bbox, 110m préparé,
+    50m pour les points proches d'une frontière.
+    """
+    lat = pd.Series(lat, dtype=float)
+    codes = pd.Series(world.locate(lat, pd.Series(lon, dtype=float)), index=lat.index, dtype=object)
+    if "ISO_A3_EH" not in world.finest:
+        return codes
+    # ISO_A3_EH corrige les -99 d'ISO_A3 (France, Norvège…) ; sinon on garde ADM0_A3
+    iso = pd.Series(world.attribute(codes, "ISO_A3_EH"), index=lat.index, dtype=object)
+    return iso.where(iso.notna() & (iso != "-99"), codes)
 
 # -------------------------------------------------------------------
 # GÉOCODEUR + CACHE
-geocoder = Nominatim(user_agent="aircrashes-perfect", timeout=10)
-cache = json.load(open(CACHE)) if CACHE.exists() else {}
-
-def geocode_location(query: str):
-    if query in cache:
-        return cache[query]
-    res = geocoder.geocode(query, exactly_one=True)
-    if not res:
-        return None
-    cache[query] = (res.latitude, res.longitude)
-    if len(cache) % 20 == 0:
-        json.dump(cache, open(CACHE, "w"), indent=2)
-    time.sleep(1)  # 1 req/s pour rester fair-use
-    return cache[query]
+def make_geocoder():
+    """
+    Renvoie geocode_location(query) -> (lat, lon) | None : cache SQLite,
+    puis gazetteer hors-ligne, puis Nominatim (1 req/s).
+    """
+    from geopy.geocoders import Nominatim
+    from geocache import open_cache
+    from gazetteer import load_default_gazetteer
+
+    geocoder = Nominatim(user_agent="aircrashes-perfect", timeout=10)
+    cache = open_cache()   # cache SQLite partagé avec data_cleaning.py (importe l'ancien geo_cache.json)
+    gazetteer = load_default_gazetteer()   # géocodeur hors-ligne (None si aucun fichier)
+
+    def geocode_location(query: str):
+        hit = cache.get(query)
+        if hit is not None:
+            return hit if hit[0] is not None else None   # (None, None) = échec déjà connu
+        if gazetteer is not None:
+            hit = gazetteer.geocode(query)   # 1er niveau : local, sans limite de débit
+            if hit:
+                return hit
+        res = geocoder.geocode(query, exactly_one=True)
+        time.sleep(1)  # 1 req/s pour rester fair-use
+        if not res:
+            cache.put_miss(query)   # pas de nouvel appel avant la date de retry
+            return None
+        cache.put(query, res.latitude, res.longitude)
+        return res.latitude, res.longitude
+
+    geocode_location.cache = cache
+    return geocode_location
+
+# -------------------------------------------------------------------
+# CHECKPOINTS : un fichier de corrections par lot + un manifeste
+def load_manifest(fingerprint: str, batch_rows: int) -> dict:
+    if MANIFEST.exists():
+        manifest = json.loads(MANIFEST.read_text(encoding="utf-8"))
+        if manifest.get("input") == fingerprint and manifest.get("batch_rows") == batch_rows:
+            return manifest
+        print("► Entrée ou taille de lot modifiée : checkpoint ignoré")
+        shutil.rmtree(CKPT_DIR)
+    return {"input": fingerprint, "batch_rows": batch_rows, "batches": {}}
+
+def save_manifest(manifest: dict):
+    CKPT_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = MANIFEST.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    os.replace(tmp, MANIFEST)   # atomique : jamais de manifeste à moitié écrit
+
+def fix_batch(df, rows, declared, world, geocode_location) -> pd.DataFrame:
+    """
+    Géocode les Location distinctes du lot, garde les points tombant dans le
+    pays déclaré et renvoie les nouvelles coordonnées (colonne row = ligne de df).
+    """
+    batch_iso = dict(zip(df.loc[rows, "Location"], declared[rows]))   # même Location → même pays
+    geocoded = {query: geocode_location(query) for query in batch_iso}
+    geocoded = pd.DataFrame.from_dict({q: hit for q, hit in geocoded.items() if hit},
+                                      orient="index", columns=["Latitude", "Longitude"])
+    hit_iso = points_to_iso(geocoded["Latitude"], geocoded["Longitude"], world)
+    hits = geocoded[hit_iso == geocoded.index.map(batch_iso)]
+    fix = df.loc[rows, ["Location"]].join(hits, on="Location").dropna(subset=["Latitude", "Longitude"])
+    return fix[["Latitude", "Longitude"]].rename_axis("row").reset_index()
 
 # -------------------------------------------------------------------
 # BOUCLE PRINCIPALE
-fixed = 0
-for idx, row in df.iterrows():
-    lat, lon = row.Latitude, row.Longitude
-    iso = country_to_iso(loc_to_country(row.Location))
-    if iso is None:
-        continue
-
-    if pd.notna(lat) and pd.notna(lon) and point_in_iso(lat, lon) == iso:
-        continue  # déjà correct
-
-    hit = geocode_location(row.Location)
-    if not hit:
-        continue
-    new_lat, new_lon = hit
-    if point_in_iso(new_lat, new_lon) == iso:
-        df.at[idx, "Latitude"]  = new_lat
-        df.at[idx, "Longitude"] = new_lon
-        fixed += 1
-        if fixed % 20 == 0:
-            print(f"→ {fixed} points corrected")
-
-print(f"Finished. {fixed} points updated.")
-df.to_csv(OUT_CSV, index=False)
-print("Wrote", OUT_CSV)
+def main(raw=RAW_CSV, out_csv=OUT_CSV, out_parquet=OUT_PARQUET, batch_rows=BATCH_ROWS):
+    raw = Path(raw)
+    if not raw.exists() and not Path(columnar_path(raw)).exists():
+        sys.exit(f"❌ CSV introuvable : {raw}")
+
+    from country_resolver import default_resolver
+
+    world = load_world()
+    df = read_table(raw)   # prend la copie Parquet si elle est à jour
+    print(f"Loaded {len(df):,} rows")
+
+    # 1) repérer les lignes dont le point ne tombe pas dans le pays déclaré
+    #    (pays déclarés résolus en un seul passage fuzzy, tous les points joints d'un coup)
+    countries = {loc: loc_to_country(loc) for loc in df["Location"].dropna().unique()}
+    iso_by_name = default_resolver().resolve_many(countries.values())
+    declared = df["Location"].map({loc: iso_by_name.get(c) for loc, c in countries.items()})
+    found = points_to_iso(df["Latitude"], df["Longitude"], world)
+    print("Containment:", world.stats)
+
+    todo = df.index[declared.notna() & (found != declared)]
+
+    # 2) traiter les lignes à corriger par lots ; chaque lot terminé est écrit
+    #    dans CKPT_DIR et noté dans le manifeste, une relance reprend au 1er lot incomplet
+    fingerprint = str(pd.util.hash_pandas_object(df[["Location", "Latitude", "Longitude"]], index=True).sum())
+    manifest = load_manifest(fingerprint, batch_rows)
+    batches = [todo[i:i + batch_rows] for i in range(0, len(todo), batch_rows)]
+    print(f"{len(todo)} rows to fix, {df.loc[todo, 'Location'].nunique()} distinct locations, "
+          f"{len(batches)} batches ({len(manifest['batches'])} already done)")
+
+    geocode_location = make_geocoder()
+    fixes = []
+    for n, rows in enumerate(batches):
+        ckpt = CKPT_DIR / f"batch_{n:05d}.parquet"
+        done = manifest["batches"].get(str(n))
+        if done and ckpt.exists():
+            fixes.append(read_table(ckpt))   # lot déjà traité : on réutilise
+            continue
+        fix = fix_batch(df, rows, declared, world, geocode_location)
+        write_table(fix, ckpt)
+        manifest["batches"][str(n)] = {"rows": len(rows), "fixed": len(fix), "file": ckpt.name}
+        save_manifest(manifest)
+        fixes.append(fix)
+        geocode_location.cache.checkpoint()
+
+    # 3) rediffuser les coordonnées sur toutes les lignes concernées
+    fix = pd.concat(fixes, ignore_index=True) if fixes else pd.DataFrame(columns=["row", "Latitude", "Longitude"])
+    df.loc[fix["row"], ["Latitude", "Longitude"]] = fix[["Latitude", "Longitude"]].to_numpy()
+
+    geocode_location.cache.checkpoint()
+    print(f"Finished. {len(fix)} points updated.")
+    write_table(df, out_parquet, csv=out_csv)
+    shutil.rmtree(CKPT_DIR, ignore_errors=True)   # sortie complète écrite : checkpoint inutile
+    return df
+
+
+if __name__ == "__main__":
+    main()
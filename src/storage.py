@@ -0,0 +1,139 @@
+"""
+Columnar storage for the pipeline stage outputs.
+
+Every stage (data_cleaning.py, pipeline.py, ...) writes its table as
+Parquet (zstd-compressed, dtypes and categoricals preserved) and, on
+request, a CSV copy next to it for people who want to open it in a
+spreadsheet. Readers ask only for the columns and rows they need: with
+Parquet/Feather the column list and the filters are pushed down to the
+file reader, so skipped columns and row groups are never decoded.
+
+Filters use the pyarrow / pandas.read_parquet format, a list of
+(column, op, value) tuples combined with AND:
+
+    read_table(path, columns=["Year", "Operator"], filters=[("Year", ">=", 2000)])
+
+Reading a .csv path transparently uses the .parquet copy beside it when
+that copy is at least as recent.
+"""
+import operator
+import os
+
+import pandas as pd
+
+_OPS = {
+    "==": operator.eq, "=": operator.eq, "!=": operator.ne,
+    "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge,
+    "in": lambda s, v: s.isin(v), "not in": lambda s, v: ~s.isin(v),
+}
+
+
+def columnar_path(path, suffix=".parquet"):
+    """
+    Returns the columnar sibling of a file: data.csv -> data.parquet.
+    """
+    return os.path.splitext(str(path))[0] + suffix
+
+
+def fresh_columnar(csv_path):
+    """
+    The .parquet copy beside a CSV when it is at least as recent as the
+    CSV, None otherwise (missing, or the CSV was rewritten since).
+    """
+    # Only the .parquet written by write_table: a .arrow beside a CSV may be
+    # the webapp's prepared copy, with different columns
+    candidate = columnar_path(csv_path)
+    csv_mtime = os.stat(csv_path).st_mtime_ns if os.path.exists(csv_path) else -1
+    if os.path.exists(candidate) and os.stat(candidate).st_mtime_ns >= csv_mtime:
+        return candidate
+    return None
+
+
+def table_columns(path):
+    """
+    Column names of a stored table, read from the file header or schema only.
+    """
+    path = str(path)
+    if path.endswith(".csv"):
+        path = fresh_columnar(path) or path
+    if path.endswith(".csv"):
+        return list(pd.read_csv(path, nrows=0).columns)
+
+    import pyarrow.dataset as ds
+
+    return ds.dataset(path, format="parquet" if path.endswith(".parquet") else "ipc").schema.names
+
+
+def write_table(df, path, csv=None):
+    """
+    Writes a stage output as Parquet (or Feather for .feather/.arrow paths).
+
+    Args:
+        df (DataFrame): Table to save.
+        path (str | Path): Output file; the format follows the extension.
+        csv (str | Path | bool): Also export a CSV copy, to this path or,
+            with True, next to `path`.
+    """
+    path = str(path)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    # Written under a temporary name, so readers never see a half-written file
+    temp_file = path + ".tmp"
+    if path.endswith((".feather", ".arrow")):
+        df.reset_index(drop=True).to_feather(temp_file, compression="zstd")
+    else:
+        df.to_parquet(temp_file, engine="pyarrow", compression="zstd", index=False)
+    os.replace(temp_file, path)
+    print(f"Saved {len(df)} rows to {path}")
+
+    if csv:
+        csv_path = columnar_path(path, ".csv") if csv is True else str(csv)
+        df.to_csv(csv_path, index=False, encoding="utf-8")
+        # Keep the columnar copy the freshest, so read_table(csv_path) still picks it
+        os.utime(path)
+        print(f"Exported CSV copy to {csv_path}")
+
+
+def _filter_frame(df, filters):
+    mask = pd.Series(True, index=df.index)
+    for col, op, value in filters:
+        mask &= _OPS[op](df[col], value)
+    return df[mask]
+
+
+def read_table(path, columns=None, filters=None):
+    """
+    Reads a stage output with column and predicate pushdown.
+
+    Args:
+        path (str | Path): .parquet, .feather/.arrow or .csv file. For a
+            .csv, an up-to-date .parquet copy beside it is used instead.
+        columns (list): Columns to read (default: all).
+        filters (list): (column, op, value) tuples, all of which must hold.
+
+    Returns:
+        DataFrame: The selected rows and columns, with a fresh RangeIndex.
+    """
+    path = str(path)
+    if path.endswith(".csv"):
+        path = fresh_columnar(path) or path
+
+    if path.endswith(".csv"):
+        # No pushdown for CSV: parse only the needed columns, filter afterwards
+        usecols = None
+        if columns is not None:
+            usecols = list(dict.fromkeys(list(columns) + [f[0] for f in filters or ()]))
+        df = pd.read_csv(path, usecols=usecols)
+        if filters:
+            df = _filter_frame(df, filters)
+        return df[list(columns)].reset_index(drop=True) if columns is not None else df.reset_index(drop=True)
+
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path, engine="pyarrow", columns=columns, filters=filters).reset_index(drop=True)
+
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+    dataset = ds.dataset(path, format="ipc")
+    expression = pq.filters_to_expression(filters) if filters else None
+    return dataset.to_table(columns=columns, filter=expression).to_pandas()
@@ -1,21 +1,213 @@
 # src/validate_geo.py
-import pandas as pd, geopandas as gpd
-from shapely.geometry import Point
+"""
+Checks that every crash point falls inside its declared country.
+
+All points are located at once by containment.CountryLocator (bbox index,
+prepared 110m polygons, 50m near borders), then each row gets a status:
+
+  OK                inside the declared country
+  GEOCODED          inside the declared country, coordinates from the geocoder
+                    (input Geo_Status GEOCODED / GEOCODED_ADJUSTED)
+  NEAR_BORDER       outside, but within NEAR_BORDER_KM of the declared country
+                    (coastal and border crashes, often a coarse-polygon artifact)
+  NO_COUNTRY_MATCH  outside the declared country
+  UNKNOWN_COUNTRY   declared country missing or not found in Natural Earth
+  MISSING_COORDS    no latitude / longitude
+
+Rows outside their country also get the distance (km) to the declared
+country's polygon. The per-row statuses go to data/processed/geo_validation
+(.parquet + .csv) and a summary to reports/geo_validation_summary.md.
+"""
+import time
 from pathlib import Path
 
-CSV   = Path("../data/processed/cleaned_aircrashes_geo_final.csv")
-SHP   = Path("../data/ne_admin0/ne_110m_admin_0_countries.shp")
+import numpy as np
+import pandas as pd
+
+from storage import read_table, table_columns, write_table
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+CSV   = BASE_DIR / "data/processed/cleaned_aircrashes_geo_FINAL.csv"
+SHP   = BASE_DIR / "data/ne_admin0/ne_110m_admin_0_countries.shp"
+STATUS_FILE  = BASE_DIR / "data/processed/geo_validation.parquet"
+SUMMARY_FILE = BASE_DIR / "reports/geo_validation_summary.md"
+
+NEAR_BORDER_KM = 25
+EARTH_RADIUS_KM = 6371.0088
+
+STATUSES = ["OK", "GEOCODED", "NEAR_BORDER", "NO_COUNTRY_MATCH", "UNKNOWN_COUNTRY", "MISSING_COORDS"]
+WORLD_NAME_COLUMNS = ["ADMIN", "NAME", "NAME_LONG", "ADM0_A3", "ISO_A3", "ISO_A3_EH"]
+
+
+def load_world(shp=SHP):
+    """
+    Tiered country locator: `shp` (110m), plus the 50m layer near borders
+    when data/ne_admin0/ has it (nothing is downloaded here).
+    """
+    from containment import CountryLocator
+
+    return CountryLocator.default(coarse_path=shp, download=False)
+
+
+def resolve_declared(names, world):
+    """
+    Maps declared country strings to row positions in `world` (-1 if unknown):
+    exact Natural Earth names and codes first, then the country resolver
+    (historic names, fuzzy matching) through ISO alpha-3.
+    """
+    from gazetteer import normalize_place
+
+    by_name, by_iso = {}, {}
+    for col in WORLD_NAME_COLUMNS:
+        if col not in world:
+            continue
+        for pos, value in enumerate(world[col]):
+            if isinstance(value, str) and value != "-99":
+                by_name.setdefault(normalize_place(value), pos)
+                if col in ("ADM0_A3", "ISO_A3", "ISO_A3_EH"):
+                    by_iso.setdefault(value, pos)
+
+    names = pd.Series(pd.unique(pd.Series(names).dropna().astype(str)))
+    positions = {name: by_name.get(normalize_place(name), -1) for name in names}
+
+    unknown = [name for name, pos in positions.items() if pos < 0]
+    if unknown:
+        from country_resolver import default_resolver
+
+        for name, iso in default_resolver().resolve_many(unknown).items():
+            positions[name] = by_iso.get(iso, -1)
+    return positions
+
+
+def border_distance_km(lat, lon, geometries):
+    """
+    Great-circle distance from each point to the nearest point of its
+    geometry (element-wise, all arrays the same length).
+    """
+    import shapely
+
+    points = shapely.points(lon, lat)
+    ends = shapely.get_coordinates(shapely.shortest_line(points, geometries)).reshape(-1, 2, 2)
+    lon1, lat1 = np.radians(ends[:, 0, 0]), np.radians(ends[:, 0, 1])
+    lon2, lat2 = np.radians(ends[:, 1, 0]), np.radians(ends[:, 1, 1])
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def validate(df, locator, near_border_km=NEAR_BORDER_KM):
+    """
+    Classifies every row of `df`.
+
+    Args:
+        df (DataFrame): Latitude, Longitude, a declared country (NE_Declared
+            when present, else Country/Region) and optionally Location and
+            Geo_Status.
+        locator (CountryLocator): From load_world().
+
+    Returns:
+        DataFrame: One row per input row with Location, Declared,
+            Found_Country, Geo_Status and Distance_km.
+    """
+    declared_col = "NE_Declared" if "NE_Declared" in df else "Country/Region"
+    lat = pd.to_numeric(df["Latitude"], errors="coerce").to_numpy(dtype=float)
+    lon = pd.to_numeric(df["Longitude"], errors="coerce").to_numpy(dtype=float)
+    has_coords = ~(np.isnan(lat) | np.isnan(lon))
+
+    world = locator.finest
+    positions = resolve_declared(df[declared_col], world)
+    declared = df[declared_col].astype(object).map(positions).fillna(-1).to_numpy(dtype=int)
+    declared_code = np.where(declared >= 0, world["ADM0_A3"].to_numpy(dtype=object)[declared], None)
+
+    found = locator.locate(lat, lon)
+    inside = has_coords & (declared >= 0) & (found == declared_code)
+
+    # Distance to the declared polygon, only for the rows outside it
+    outside = has_coords & (declared >= 0) & ~inside
+    distance = np.full(len(df), np.nan)
+    if outside.any():
+        geoms = np.asarray(world.geometry.array)[declared[outside]]
+        distance[outside] = border_distance_km(lat[outside], lon[outside], geoms)
+
+    geocoded = np.zeros(len(df), dtype=bool)
+    if "Geo_Status" in df:
+        geocoded = df["Geo_Status"].astype(str).str.startswith("GEOCODED").to_numpy()
+
+    status = np.select(
+        [~has_coords, declared < 0, inside & geocoded, inside, distance <= near_border_km],
+        ["MISSING_COORDS", "UNKNOWN_COUNTRY", "GEOCODED", "OK", "NEAR_BORDER"],
+        default="NO_COUNTRY_MATCH",
+    )
+
+    return pd.DataFrame({
+        "Location": df["Location"].to_numpy() if "Location" in df else None,
+        "Declared": df[declared_col].to_numpy(),
+        "Found_Country": locator.attribute(found, "ADMIN"),
+        "Geo_Status": pd.Categorical(status, categories=STATUSES),
+        "Distance_km": distance.round(1),
+    }, index=df.index)
+
+
+def write_summary(report, path, source, seconds, stats=None):
+    counts = report["Geo_Status"].value_counts().reindex(STATUSES, fill_value=0)
+    outside = report[report["Geo_Status"].isin(["NEAR_BORDER", "NO_COUNTRY_MATCH"])]
+
+    lines = [
+        "## Geo Validation",
+        "",
+        f"Source: `{Path(source).name}` — {len(report):,} rows, validated in {seconds:.2f} s "
+        f"({time.strftime('%Y-%m-%d %H:%M')})",
+        "",
+        "| Status | Rows | Share |",
+        "|---|---:|---:|",
+    ]
+    for status, n in counts.items():
+        lines.append(f"| {status} | {n:,} | {n / max(len(report), 1):.1%} |")
+
+    if stats:
+        lines += [
+            "",
+            f"Containment: {stats['bbox_rejected']:,} points rejected by bounding box, "
+            f"{stats['coarse_only']:,} settled on 110m, {stats['escalated']:,} checked on the fine layer.",
+        ]
+
+    if len(outside):
+        q = outside["Distance_km"].quantile([0.5, 0.9, 0.99])
+        lines += [
+            "",
+            f"Distance to the declared country for rows outside it: median {q[0.5]:.0f} km, "
+            f"p90 {q[0.9]:.0f} km, p99 {q[0.99]:.0f} km (near border: ≤ {NEAR_BORDER_KM} km).",
+            "",
+            "### Declared countries with the most mismatches",
+            "",
+            "| Declared | Rows |",
+            "|---|---:|",
+        ]
+        top = outside[outside["Geo_Status"] == "NO_COUNTRY_MATCH"]["Declared"].value_counts().head(10)
+        lines += [f"| {name} | {n} |" for name, n in top.items()]
+
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    Path(path).write_text("\n".join(lines) + "\n", encoding="utf-8")
+    print("Wrote", path)
+
+
+def main(csv=CSV, shp=SHP, status_file=STATUS_FILE, summary_file=SUMMARY_FILE):
+    start = time.perf_counter()
+    wanted = ["Latitude", "Longitude", "Country/Region", "NE_Declared", "Location", "Geo_Status"]
+    available = set(table_columns(csv))
+    df = read_table(csv, columns=[c for c in wanted if c in available])
+    locator = load_world(shp)
+
+    report = validate(df, locator)
+    seconds = time.perf_counter() - start
+
+    write_table(report.rename_axis("row").reset_index(), status_file, csv=True)
+    write_summary(report, summary_file, csv, seconds, locator.stats)
 
-df     = pd.read_csv(CSV)
-world  = gpd.read_file(SHP)
+    counts = report["Geo_Status"].value_counts()
+    nb_errors = int(counts.get("NO_COUNTRY_MATCH", 0))
+    print(f"Incohérences restantes : {nb_errors} sur {len(df)} lignes ({seconds:.2f} s)")
+    return counts
 
-def mismatch(row):
-    # Ignore les NaN
-    if pd.isna(row.Latitude) or pd.isna(row.Longitude):
-        return True
-    pt   = Point(row.Longitude, row.Latitude)
-    poly = world[world.contains(pt)]
-    return poly.empty or poly.iloc[0]["NAME"] != row["Country/Region"]
 
-nb_errors = df.apply(mismatch, axis=1).sum()
-print(f"Incohérences restantes : {nb_errors} sur {len(df)} lignes")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# The pipeline modules import each other by flat name (python src/cli.py ...)
+sys.path.insert(0, os.path.join(ROOT, "src"))
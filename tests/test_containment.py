@@ -0,0 +1,40 @@
+import geopandas as gpd
+import numpy as np
+import pytest
+from shapely.geometry import MultiPolygon, box
+
+from containment import CountryLocator
+
+# Malta and Bahrain are missing from Natural Earth 110m, present in 50m
+ITALY = box(6.6, 36.6, 18.5, 47.1)
+MALTA = box(14.18, 35.8, 14.58, 36.08)
+BAHRAIN = box(50.38, 25.79, 50.66, 26.29)
+# Two parts at opposite ends of the map, so the whole bbox covers open ocean
+FAR_FLUNG = MultiPolygon([box(-170, -15, -169, -14), box(170, -15, 171, -14)])
+
+
+@pytest.fixture
+def locator():
+    coarse = gpd.GeoDataFrame({"ADM0_A3": ["ITA", "FFC"]}, geometry=[ITALY, FAR_FLUNG], crs=4326)
+    fine = gpd.GeoDataFrame({"ADM0_A3": ["ITA", "MLT", "BHR", "FFC"]},
+                            geometry=[ITALY, MALTA, BAHRAIN, FAR_FLUNG], crs=4326)
+    return CountryLocator(coarse, fine)
+
+
+def test_countries_missing_from_coarse_layer(locator):
+    codes = locator.locate([35.9, 26.1], [14.45, 50.55])   # Valletta, Manama
+    assert list(codes) == ["MLT", "BHR"]
+    assert locator.stats["escalated"] == 2
+
+
+def test_open_ocean_is_not_escalated(locator):
+    codes = locator.locate([-30.0, 0.0], [-140.0, 0.0])   # inside FAR_FLUNG's bbox only
+    assert list(codes) == [None, None]
+    assert locator.stats["escalated"] == 0
+
+
+def test_inside_coarse_country_stays_coarse(locator):
+    codes = locator.locate([42.0, np.nan], [12.5, 12.5])
+    assert list(codes) == ["ITA", None]
+    assert locator.stats["escalated"] == 0
+    assert locator.stats["missing_coords"] == 1
@@ -0,0 +1,24 @@
+import pytest
+
+from country_resolver import CountryResolver
+
+
+@pytest.fixture(scope="module")
+def resolver():
+    return CountryResolver()
+
+
+@pytest.mark.parametrize("name, iso", [
+    ("France", "FRA"),
+    ("FR", "FRA"),
+    ("NER", "NER"),
+    ("USSR", "RUS"),
+    ("Swtizerland", "CHE"),
+])
+def test_names_and_codes(resolver, name, iso):
+    assert resolver.resolve(name) == iso
+
+
+@pytest.mark.parametrize("word", ["Near", "Tura"])
+def test_short_words_do_not_match_codes(resolver, word):
+    assert resolver.resolve(word) is None
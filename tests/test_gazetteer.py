@@ -0,0 +1,41 @@
+import pandas as pd
+import pytest
+
+from gazetteer import Gazetteer
+
+
+@pytest.fixture(scope="module")
+def gazetteer():
+    places = pd.DataFrame({
+        "name": ["Paris", "Zurich", "Moscow", "Manchester", "Moscow"],
+        "latitude": [48.85, 47.37, 55.75, 53.48, 46.73],
+        "longitude": [2.35, 8.54, 37.62, -2.24, -117.0],
+        "country": ["FR", "CH", "RU", "GB", "US"],
+        "population": [2_100_000, 420_000, 12_600_000, 550_000, 25_000],
+    })
+    return Gazetteer(places)
+
+
+def name_of(gazetteer, query):
+    i = gazetteer.lookup(query)
+    return None if i is None else (gazetteer.country[i], round(gazetteer.lat[i], 2))
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("Zurich Switzerland", ("CH", 47.37)),
+    ("Moscow Russia", ("RU", 55.75)),
+    ("Moscow United States", ("US", 46.73)),
+    ("Manchester England", ("GB", 53.48)),
+    ("Zurich, Switzerland", ("CH", 47.37)),
+])
+def test_country_in_trailing_words(gazetteer, query, expected):
+    assert name_of(gazetteer, query) == expected
+
+
+def test_unknown_region_after_comma_gives_no_answer(gazetteer):
+    assert gazetteer.lookup("Paris, Texas") is None
+    assert name_of(gazetteer, "Paris, France") == ("FR", 48.85)
+
+
+def test_country_hint_excludes_other_countries(gazetteer):
+    assert gazetteer.lookup("Paris Switzerland") is None
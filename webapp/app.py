@@ -1,227 +1,108 @@
 # webapp/app.py
 
 import pandas as pd
-import plotly.express as px
-from dash import Dash, dcc, html, Input, Output , dash_table
+from dash import Dash, dcc, html, Input, Output, State, dash_table, ctx
+from dash.exceptions import PreventUpdate
 
-# Load and prepare data
-df = pd.read_csv("../data/processed/cleaned_aircrashes_geo_FINAL.csv")
-# Combine Year, Month, Day into a proper datetime
-df['Date'] = pd.to_datetime(dict(
-    year=df['Year'],
-    month=df['Month'],
-    day=df['Day']
-), errors='coerce')
+from data_store import CrashDataStore
+from filter_cache import FilterCache
+from cube import CrashCube
+from clustering import cluster_points, parse_viewport
+from operator_index import OperatorIndex
+from table_pages import DEFAULT_SORT, TablePager
+from snapshot import load_snapshot
+from metrics import instrumented, stage
+import figures
+import metrics
 
-df = df.dropna(subset=['Latitude', 'Longitude', 'Year', 'Fatalities_air'])
+# Callbacks share one prepared frame; copy-on-write keeps it read-only for them
+pd.set_option("mode.copy_on_write", True)
 
-# Initialize app
-app = Dash(__name__)
-app.title = "Air Crashes Map"
+# Load and prepare data (once – the store reloads only if the file changes)
+store = CrashDataStore()
 
-# App layout
-app.layout = html.Div([
-    html.H1("Global Air Crashes (1908–2023)", style={'textAlign': 'center'}),
-    # KPI Banner
-    html.Div(id='kpi-container', style={
-        'display': 'flex',
-        'justifyContent': 'space-around',
-        'padding': '20px',
-        'backgroundColor': '#f9f9f9',
-        'borderRadius': '10px',
-        'margin': '20px auto',
-        'width': '85%',
-        'boxShadow': '0 0 8px rgba(0,0,0,0.1)'
-    }),
-
-    # Filters
-    html.Div([
-        html.Label("Year Range:"),
-        dcc.RangeSlider(
-            id='year-slider',
-            min=int(df['Year'].min()),
-            max=int(df['Year'].max()),
-            step=1,
-            value=[2000, 2023],
-            marks={y: str(y) for y in range(int(df['Year'].min()), int(df['Year'].max())+1, 10)},
-            tooltip={"placement": "bottom", "always_visible": False}
-        ),
-        html.Br(),
-
-        html.Label("Operator:"),
-        dcc.Dropdown(
-            id='operator-filter',
-            options=[{'label': op, 'value': op} for op in sorted(df['Operator'].dropna().unique())],
-            multi=True,
-            placeholder="Filter by operator...",
-        ),
-        html.Br(),
-
-        html.Label("Fatalities Range:"),
-        dcc.RangeSlider(
-            id='fatalities-slider',
-            min=int(df['Fatalities_air'].min()),
-            max=int(df['Fatalities_air'].max()),
-            value=[0, 300],
-            tooltip={"placement": "bottom", "always_visible": False}
-        ),
-    
-    ], style={'width': '85%', 'margin': 'auto'}),
-
-    # Map
-    html.Div([
-        dcc.Graph(id='crash-map')
-    ], style={'padding': '20px'}),
-    # Trend Over Time Chart
-    html.Div([
-        html.H2("Crashes & Fatalities Over Time", style={'textAlign': 'center', 'marginTop': '40px'}),
-        dcc.Graph(id='trend-line-chart')
-    ], style={'width': '85%', 'margin': 'auto'}),
-    # Choropleth Map
-    html.Div([
-        html.H2("Crashes by Country", style={'textAlign': 'center', 'marginTop': '40px'}),
-        dcc.Graph(id='country-choropleth')
-    ], style={'width': '85%', 'margin': 'auto'}),
-
-    # Recent Crashes Table
-    html.Div([
-        html.H2("Recent Crashes", style={'textAlign': 'center', 'marginTop': '40px'}),
-        dcc.Loading(
-            dash_table.DataTable(
-                id='recent-crashes-table',
-                columns=[
-                    {"name": "Date", "id": "Date"},
-                    {"name": "Operator", "id": "Operator"},
-                    {"name": "Aircraft", "id": "Aircraft"},
-                    {"name": "Location", "id": "Location"},
-                    {"name": "Fatalities", "id": "Fatalities_air"}
-                ],
-                style_table={'overflowX': 'auto'},
-                style_cell={'textAlign': 'left'},
-                page_size=10
-            ),
-            type="default"
-        )
-        ], style={'width': '90%', 'margin': 'auto'})
-])
+# One filter result per (year_range, operators, fatalities_range), shared by all callbacks
+filter_cache = FilterCache(store)
 
+# KPIs, trend line and choropleth are answered from this pre-aggregated cube
+cube = CrashCube(store)
 
-@app.callback(
-    Output("crash-map", "figure"),
-    Input("year-slider", "value"),
-    Input("operator-filter", "value"),
-    Input("fatalities-slider", "value")
-)
-def update_map(year_range, selected_operators, fatalities_range):
-    # Load data
-    df = pd.read_csv("../data/processed/cleaned_aircrashes_geo_FINAL.csv")
-
-    # Map month names to numeric values
-    month_map = {
-        'January': 1, 'February': 2, 'March': 3, 'April': 4,
-        'May': 5, 'June': 6, 'July': 7, 'August': 8,
-        'September': 9, 'October': 10, 'November': 11, 'December': 12
-    }
-    df['Month'] = df['Month'].map(month_map)
-
-    # Drop invalid rows
-    df = df.dropna(subset=['Year', 'Month', 'Day', 'Latitude', 'Longitude', 'Fatalities_air'])
-
-    # Rebuild Date column
-    df['Date'] = pd.to_datetime(dict(
-        year=df['Year'].astype(int),
-        month=df['Month'].astype(int),
-        day=df['Day'].astype(int)
-    ), errors='coerce')
-    df['Date'] = df['Date'].dt.strftime("%Y-%m-%d")
-
-    # Apply filters
-    filtered = df[
-        (df["Year"] >= year_range[0]) & (df["Year"] <= year_range[1]) &
-        (df["Fatalities_air"] >= fatalities_range[0]) & (df["Fatalities_air"] <= fatalities_range[1])
-    ]
+# Operator dropdown options are searched server-side instead of shipped in the layout
+operator_index = OperatorIndex(store)
+OPERATOR_OPTIONS = 20
 
-    if selected_operators:
-        filtered = filtered[filtered["Operator"].isin(selected_operators)]
-
-    # Build interactive map
-    fig = px.scatter_mapbox(
-        filtered,
-        lat="Latitude",
-        lon="Longitude",
-        hover_name="Operator",
-        hover_data={
-            "Date": True,
-            "Aircraft": True,
-            "Fatalities_air": True,
-            "Location": True,
-            "Latitude": False,
-            "Longitude": False
-        },
-        size="Fatalities_air",
-        color="Fatalities_air",
-        color_continuous_scale="Reds",
-        size_max=15,
-        zoom=1,
-        height=700
-    )
-
-    fig.update_layout(mapbox_style="carto-positron", margin={"r":0,"t":0,"l":0,"b":0})
-    return fig
+# The crashes table is paged and sorted server-side
+table_pager = TablePager(store, filter_cache)
 
 
+# Filter state every visitor lands on: year range, operators, fatalities range
+DEFAULT_FILTERS = [[2000, 2023], None, [0, 300]]
+TABLE_PAGE_SIZE = 10
 
-@app.callback(
-    Output('kpi-container', 'children'),
-    Input("year-slider", "value"),
-    Input("operator-filter", "value"),
-    Input("fatalities-slider", "value")
-)
-def update_kpis(year_range, selected_operators, fatalities_range):
-    df = pd.read_csv("../data/processed/cleaned_aircrashes_geo_FINAL.csv")
 
-    # Month mapping
-    month_map = {
-        'January': 1, 'February': 2, 'March': 3, 'April': 4,
-        'May': 5, 'June': 6, 'July': 7, 'August': 8,
-        'September': 9, 'October': 10, 'November': 11, 'December': 12
-    }
-    df['Month'] = df['Month'].map(month_map)
+def filter_frame(year_range, selected_operators, fatalities_range):
+    """
+    Applies the three dashboard filters to the shared crash frame.
+    """
+    with stage("data"):
+        df = store.frame()
+    with stage("filter"):
+        rows = filter_cache.rows(year_range, selected_operators, fatalities_range)
+    return df.iloc[rows]
 
-    df = df.dropna(subset=['Year', 'Month', 'Day', 'Latitude', 'Longitude', 'Fatalities_air'])
 
-    df['Date'] = pd.to_datetime(dict(
-        year=df['Year'].astype(int),
-        month=df['Month'].astype(int),
-        day=df['Day'].astype(int)
-    ), errors='coerce')
+# Views: plain data for one filter state, shared by the callbacks and the snapshot
 
-    # Filter
-    filtered = df[
-        (df["Year"] >= year_range[0]) & (df["Year"] <= year_range[1]) &
-        (df["Fatalities_air"] >= fatalities_range[0]) & (df["Fatalities_air"] <= fatalities_range[1])
-    ]
+def map_view(year_range, selected_operators, fatalities_range, relayout_data=None):
+    filtered = filter_frame(year_range, selected_operators, fatalities_range)
+
+    with stage("figure"):
+        # Cluster at low zoom so the payload stays bounded; single crashes when zoomed in
+        zoom, bounds = parse_viewport(relayout_data)
+        points, clustered = cluster_points(filtered, zoom, bounds)
+        return figures.map_data(points, clustered)
 
-    if selected_operators:
-        filtered = filtered[filtered["Operator"].isin(selected_operators)]
-
-    total_crashes = len(filtered)
-    total_fatalities = int(filtered['Fatalities_air'].sum())
-    avg_fatalities = round(filtered['Fatalities_air'].mean(), 1) if total_crashes else 0
-    worst_crash = int(filtered['Fatalities_air'].max()) if total_crashes else 0
-
-    def card(title, value):
-        return html.Div([
-            html.H4(title, style={'marginBottom': '5px'}),
-            html.H2(f"{value}", style={'color': '#D9534F' if 'Fatalities' in title else '#333'})
-        ], style={
-            'padding': '10px 20px',
-            'backgroundColor': 'white',
-            'borderRadius': '8px',
-            'textAlign': 'center',
-            'boxShadow': '0 0 5px rgba(0,0,0,0.1)'
-        })
 
+def kpi_view(year_range, selected_operators, fatalities_range):
+    with stage("filter"):
+        total_crashes, total_fatalities, worst_crash = cube.totals(year_range, selected_operators, fatalities_range)
+    avg_fatalities = round(total_fatalities / total_crashes, 1) if total_crashes else 0
+    return [total_crashes, total_fatalities, avg_fatalities, worst_crash]
+
+
+def trend_view(year_range, selected_operators, fatalities_range):
+    # Yearly totals, rolled up from the cube
+    with stage("filter"):
+        yearly = cube.by_year(year_range, selected_operators, fatalities_range)
+    with stage("figure"):
+        yearly = yearly.rename(columns={"count": "Total_Crashes", "sum": "Total_Fatalities"})
+        return figures.trend_data(yearly)
+
+
+def choropleth_view(year_range, selected_operators, fatalities_range):
+    # Country totals, rolled up from the cube
+    with stage("filter"):
+        grouped = cube.by_country(year_range, selected_operators, fatalities_range)
+    with stage("figure"):
+        grouped = grouped.rename(columns={"count": "Total_Crashes", "sum": "Total_Fatalities"})
+        return figures.choropleth_data(grouped)
+
+
+def card(title, value):
+    return html.Div([
+        html.H4(title, style={'marginBottom': '5px'}),
+        html.H2(f"{value}", style={'color': '#D9534F' if 'Fatalities' in title else '#333'})
+    ], style={
+        'padding': '10px 20px',
+        'backgroundColor': 'white',
+        'borderRadius': '8px',
+        'textAlign': 'center',
+        'boxShadow': '0 0 5px rgba(0,0,0,0.1)'
+    })
+
+
+def kpi_cards(values):
+    total_crashes, total_fatalities, avg_fatalities, worst_crash = values
     return [
         card("Total Crashes", total_crashes),
         card("Total Fatalities", total_fatalities),
@@ -230,147 +111,304 @@ def update_kpis(year_range, selected_operators, fatalities_range):
     ]
 
 
-@app.callback(
-    Output('trend-line-chart', 'figure'),
-    Input("year-slider", "value"),
-    Input("operator-filter", "value"),
-    Input("fatalities-slider", "value")
-)
-def update_trend_line(year_range, selected_operators, fatalities_range):
-    df = pd.read_csv("../data/processed/cleaned_aircrashes_geo_FINAL.csv")
-
-    # Month name → number
-    month_map = {
-        'January': 1, 'February': 2, 'March': 3, 'April': 4,
-        'May': 5, 'June': 6, 'July': 7, 'August': 8,
-        'September': 9, 'October': 10, 'November': 11, 'December': 12
+def render_state(year_range, selected_operators, fatalities_range):
+    """
+    Renders everything the page shows for one filter state.
+    """
+    filters = (year_range, selected_operators, fatalities_range)
+    records, page_count = table_pager.page(*filters, 0, TABLE_PAGE_SIZE, DEFAULT_SORT)
+    return {
+        "map": map_view(*filters),
+        "kpis": kpi_view(*filters),
+        "trend": trend_view(*filters),
+        "choropleth": choropleth_view(*filters),
+        "table": {"data": records, "page_count": page_count},
     }
-    df['Month'] = df['Month'].map(month_map)
 
-    # Drop missing data
-    df = df.dropna(subset=['Year', 'Month', 'Day', 'Latitude', 'Longitude', 'Fatalities_air'])
 
-    # Filters
-    filtered = df[
-        (df["Year"] >= year_range[0]) & (df["Year"] <= year_range[1]) &
-        (df["Fatalities_air"] >= fatalities_range[0]) & (df["Fatalities_air"] <= fatalities_range[1])
-    ]
-    if selected_operators:
-        filtered = filtered[filtered["Operator"].isin(selected_operators)]
+_default_state = {}
 
-    # Group by year
-    yearly = filtered.groupby("Year").agg({
-        "Fatalities_air": "sum",
-        "Aircraft": "count"  # just to count rows (crashes)
-    }).reset_index().rename(columns={"Aircraft": "Total_Crashes", "Fatalities_air": "Total_Fatalities"})
 
-    # Build figure
-    fig = px.line(yearly, x="Year", y=["Total_Crashes", "Total_Fatalities"],
-                  labels={"value": "Count", "variable": "Metric"},
-                  title="Yearly Trends of Crashes and Fatalities")
+def default_state():
+    """
+    Returns the default-state render for the current data version: the
+    prebuilt snapshot when it matches the dataset, otherwise rendered once here.
+    """
+    store.frame()
+    if store.version not in _default_state:
+        state = load_snapshot(store.digest, DEFAULT_FILTERS) or render_state(*DEFAULT_FILTERS)
+        _default_state.clear()
+        _default_state[store.version] = state
+    return _default_state[store.version]
 
-    fig.update_layout(
-        template="plotly_white",
-        margin={"r": 20, "t": 40, "l": 20, "b": 40},
-        legend_title_text=""
-    )
 
-    return fig
+def warm_up():
+    """
+    Loads the data and builds every index and the default view, so the first
+    real request is served at steady-state speed.
+    """
+    serve_layout()
+    operator_index.top(OPERATOR_OPTIONS)
 
-@app.callback(
-    Output('country-choropleth', 'figure'),
-    Input("year-slider", "value"),
-    Input("operator-filter", "value"),
-    Input("fatalities-slider", "value")
-)
-def update_choropleth(year_range, selected_operators, fatalities_range):
-    df = pd.read_csv("../data/processed/cleaned_aircrashes_geo_FINAL.csv")
 
-    # Month mapping
-    month_map = {
-        'January': 1, 'February': 2, 'March': 3, 'April': 4,
-        'May': 5, 'June': 6, 'July': 7, 'August': 8,
-        'September': 9, 'October': 10, 'November': 11, 'December': 12
-    }
-    df['Month'] = df['Month'].map(month_map)
+# Initialize app
+app = Dash(__name__)
+app.title = "Air Crashes Map"
+server = app.server  # WSGI entry point for gunicorn (see gunicorn.conf.py)
+
+# Per-callback stage timings, payload sizes and cache hits on /metrics
+metrics.init_app(server)
+
+
+@app.server.route("/cache-stats")
+def cache_stats():
+    return filter_cache.stats()
+
+
+_layout = {}
+
+
+def serve_layout():
+    """
+    Returns the page for the current data version, built once per version:
+    every visitor gets the same default state, so the figures aren't rebuilt
+    on each page load.
+    """
+    store.frame()
+    if store.version not in _layout:
+        page = build_layout()
+        _layout.clear()
+        _layout[store.version] = page
+    return _layout[store.version]
+
+
+def build_layout():
+    """
+    Builds the page with the default state already filled in, so the first
+    paint needs no callback round-trips.
+    """
+    df = store.frame()
+    state = default_state()
+    year_range, _, fatalities_range = DEFAULT_FILTERS
+
+    return html.Div([
+        html.H1("Global Air Crashes (1908–2023)", style={'textAlign': 'center'}),
+        # KPI Banner
+        html.Div(kpi_cards(state["kpis"]), id='kpi-container', style={
+            'display': 'flex',
+            'justifyContent': 'space-around',
+            'padding': '20px',
+            'backgroundColor': '#f9f9f9',
+            'borderRadius': '10px',
+            'margin': '20px auto',
+            'width': '85%',
+            'boxShadow': '0 0 8px rgba(0,0,0,0.1)'
+        }),
+
+        # Filters
+        html.Div([
+            html.Label("Year Range:"),
+            dcc.RangeSlider(
+                id='year-slider',
+                min=int(df['Year'].min()),
+                max=int(df['Year'].max()),
+                step=1,
+                value=year_range,
+                marks={y: str(y) for y in range(int(df['Year'].min()), int(df['Year'].max())+1, 10)},
+                tooltip={"placement": "bottom", "always_visible": False}
+            ),
+            html.Br(),
+
+            html.Label("Operator:"),
+            dcc.Dropdown(
+                id='operator-filter',
+                options=[{'label': op, 'value': op} for op in operator_index.top(OPERATOR_OPTIONS)],
+                multi=True,
+                placeholder="Type to search operators...",
+            ),
+            html.Br(),
+
+            html.Label("Fatalities Range:"),
+            dcc.RangeSlider(
+                id='fatalities-slider',
+                min=int(df['Fatalities_air'].min()),
+                max=int(df['Fatalities_air'].max()),
+                value=fatalities_range,
+                tooltip={"placement": "bottom", "always_visible": False}
+            ),
 
-    df = df.dropna(subset=['Year', 'Month', 'Day', 'Latitude', 'Longitude', 'Fatalities_air', 'Country/Region'])
+        ], style={'width': '85%', 'margin': 'auto'}),
+
+        # Map
+        html.Div([
+            dcc.Graph(id='crash-map', figure=figures.map_figure(state["map"]))
+        ], style={'padding': '20px'}),
+        # Trend Over Time Chart
+        html.Div([
+            html.H2("Crashes & Fatalities Over Time", style={'textAlign': 'center', 'marginTop': '40px'}),
+            dcc.Graph(id='trend-line-chart', figure=figures.trend_figure(state["trend"]))
+        ], style={'width': '85%', 'margin': 'auto'}),
+        # Choropleth Map
+        html.Div([
+            html.H2("Crashes by Country", style={'textAlign': 'center', 'marginTop': '40px'}),
+            dcc.Graph(id='country-choropleth', figure=figures.choropleth_figure(state["choropleth"]))
+        ], style={'width': '85%', 'margin': 'auto'}),
+
+        # Recent Crashes Table
+        html.Div([
+            html.H2("Recent Crashes", style={'textAlign': 'center', 'marginTop': '40px'}),
+            dcc.Loading(
+                dash_table.DataTable(
+                    id='recent-crashes-table',
+                    columns=[
+                        {"name": "Date", "id": "Date"},
+                        {"name": "Operator", "id": "Operator"},
+                        {"name": "Aircraft", "id": "Aircraft"},
+                        {"name": "Location", "id": "Location"},
+                        {"name": "Fatalities", "id": "Fatalities_air"}
+                    ],
+                    style_table={'overflowX': 'auto'},
+                    style_cell={'textAlign': 'left'},
+                    data=state["table"]["data"],
+                    page_count=state["table"]["page_count"],
+                    page_current=0,
+                    page_size=TABLE_PAGE_SIZE,
+                    page_action='custom',
+                    sort_action='custom',
+                    sort_mode='single',
+                    sort_by=DEFAULT_SORT
+                ),
+                type="default"
+            )
+            ], style={'width': '90%', 'margin': 'auto'})
+    ])
+
+
+# Every component the callbacks use, without data. Dash checks callbacks
+# against this instead of calling serve_layout at import time, so importing
+# the app (gunicorn workers, the CLI, benchmarks) doesn't read the dataset.
+app.validation_layout = html.Div([
+    html.Div(id='kpi-container'),
+    dcc.RangeSlider(id='year-slider', min=0, max=1),
+    dcc.Dropdown(id='operator-filter', multi=True),
+    dcc.RangeSlider(id='fatalities-slider', min=0, max=1),
+    dcc.Graph(id='crash-map'),
+    dcc.Graph(id='trend-line-chart'),
+    dcc.Graph(id='country-choropleth'),
+    dash_table.DataTable(id='recent-crashes-table', page_action='custom', sort_action='custom'),
+])
 
-    df['Date'] = pd.to_datetime(dict(
-        year=df['Year'].astype(int),
-        month=df['Month'].astype(int),
-        day=df['Day'].astype(int)
-    ), errors='coerce')
+# App layout (a function, so a data reload also refreshes the first paint)
+app.layout = serve_layout
 
-    # Filter
-    filtered = df[
-        (df["Year"] >= year_range[0]) & (df["Year"] <= year_range[1]) &
-        (df["Fatalities_air"] >= fatalities_range[0]) & (df["Fatalities_air"] <= fatalities_range[1])
-    ]
 
-    if selected_operators:
-        filtered = filtered[filtered["Operator"].isin(selected_operators)]
+@app.callback(
+    Output("operator-filter", "options"),
+    Input("operator-filter", "search_value"),
+    State("operator-filter", "value"),
+    prevent_initial_call=True
+)
+@instrumented("update_operator_options")
+def update_operator_options(search_value, selected_operators):
+    selected = selected_operators or []
+    with stage("filter"):
+        matches = operator_index.search(search_value or "", limit=OPERATOR_OPTIONS)
 
-    # Group by country
-    grouped = filtered.groupby("Country/Region").agg({
-        "Fatalities_air": "sum",
-        "Aircraft": "count"
-    }).reset_index().rename(columns={"Aircraft": "Total_Crashes", "Fatalities_air": "Total_Fatalities"})
+    # Selected operators must stay in the options or the dropdown drops them
+    options = [{'label': op, 'value': op} for op in selected]
+    # The dropdown filters options again in the browser (substring of label
+    # or `search`), so matches carry the query to survive fuzzy hits like "aeroflt"
+    options += [{'label': op, 'value': op, 'search': search_value or ''}
+                for op in matches if op not in selected]
+    return options
 
-    # Choropleth
-    fig = px.choropleth(
-        grouped,
-        locations="Country/Region",
-        locationmode="country names",
-        color="Total_Crashes",  # Can also switch to "Total_Fatalities"
-        hover_name="Country/Region",
-        color_continuous_scale="Reds",
-        title="Total Crashes by Country"
-    )
 
-    fig.update_layout(margin={"r":0, "t":40, "l":0, "b":0})
+@app.callback(
+    Output("crash-map", "figure"),
+    Input("year-slider", "value"),
+    Input("operator-filter", "value"),
+    Input("fatalities-slider", "value"),
+    Input("crash-map", "relayoutData"),
+    prevent_initial_call=True
+)
+@instrumented("update_map")
+def update_map(year_range, selected_operators, fatalities_range, relayout_data):
+    # The first render reports {'autosize': True}; nothing to redraw for that
+    if relayout_data and "mapbox.zoom" not in relayout_data and ctx.triggered_id == "crash-map":
+        raise PreventUpdate
 
-    return fig
+    # Only the marker arrays travel; the map layout stays in the browser
+    data = map_view(year_range, selected_operators, fatalities_range, relayout_data)
+    with stage("figure"):
+        return figures.map_patch(data)
 
 
 @app.callback(
-    Output("recent-crashes-table", "data"),
+    Output('kpi-container', 'children'),
     Input("year-slider", "value"),
     Input("operator-filter", "value"),
-    Input("fatalities-slider", "value")
+    Input("fatalities-slider", "value"),
+    prevent_initial_call=True
 )
-def update_table(year_range, selected_operators, fatalities_range):
-    df = pd.read_csv("../data/processed/cleaned_aircrashes_geo_FINAL.csv")
+@instrumented("update_kpis")
+def update_kpis(year_range, selected_operators, fatalities_range):
+    values = kpi_view(year_range, selected_operators, fatalities_range)
+    with stage("figure"):
+        return kpi_cards(values)
 
-    month_map = {
-        'January': 1, 'February': 2, 'March': 3, 'April': 4,
-        'May': 5, 'June': 6, 'July': 7, 'August': 8,
-        'September': 9, 'October': 10, 'November': 11, 'December': 12
-    }
-    df['Month'] = df['Month'].map(month_map)
 
-    df = df.dropna(subset=['Year', 'Month', 'Day', 'Latitude', 'Longitude', 'Fatalities_air'])
+@app.callback(
+    Output('trend-line-chart', 'figure'),
+    Input("year-slider", "value"),
+    Input("operator-filter", "value"),
+    Input("fatalities-slider", "value"),
+    prevent_initial_call=True
+)
+@instrumented("update_trend_line")
+def update_trend_line(year_range, selected_operators, fatalities_range):
+    data = trend_view(year_range, selected_operators, fatalities_range)
+    with stage("figure"):
+        return figures.trend_patch(data)
 
-    df['Date'] = pd.to_datetime(dict(
-        year=df['Year'].astype(int),
-        month=df['Month'].astype(int),
-        day=df['Day'].astype(int)
-    ), errors='coerce')
 
-    filtered = df[
-        (df["Year"] >= year_range[0]) & (df["Year"] <= year_range[1]) &
-        (df["Fatalities_air"] >= fatalities_range[0]) & (df["Fatalities_air"] <= fatalities_range[1])
-    ]
+@app.callback(
+    Output('country-choropleth', 'figure'),
+    Input("year-slider", "value"),
+    Input("operator-filter", "value"),
+    Input("fatalities-slider", "value"),
+    prevent_initial_call=True
+)
+@instrumented("update_choropleth")
+def update_choropleth(year_range, selected_operators, fatalities_range):
+    data = choropleth_view(year_range, selected_operators, fatalities_range)
+    with stage("figure"):
+        return figures.choropleth_patch(data)
 
-    if selected_operators:
-        filtered = filtered[filtered["Operator"].isin(selected_operators)]
 
-    filtered['Date'] = filtered['Date'].dt.strftime("%Y-%m-%d")
+FILTER_INPUTS = {"year-slider", "operator-filter", "fatalities-slider"}
 
-    # Show most recent first
-    filtered = filtered.sort_values(by="Date", ascending=False)
 
-    return filtered[["Date", "Operator", "Aircraft", "Location", "Fatalities_air"]].head(20).to_dict("records")
+@app.callback(
+    Output("recent-crashes-table", "data"),
+    Output("recent-crashes-table", "page_count"),
+    Output("recent-crashes-table", "page_current"),
+    Input("year-slider", "value"),
+    Input("operator-filter", "value"),
+    Input("fatalities-slider", "value"),
+    Input("recent-crashes-table", "page_current"),
+    Input("recent-crashes-table", "page_size"),
+    Input("recent-crashes-table", "sort_by"),
+    prevent_initial_call=True
+)
+@instrumented("update_table")
+def update_table(year_range, selected_operators, fatalities_range, page_current, page_size, sort_by):
+    # A filter change starts over from the first page
+    if page_current and ctx.triggered_id in FILTER_INPUTS:
+        page_current = 0
+    # Most recent first unless the user sorts by another column
+    records, page_count = table_pager.page(year_range, selected_operators, fatalities_range,
+                                           page_current, page_size, sort_by)
+    return records, page_count, min(page_current or 0, page_count - 1)
 
 
 
@@ -0,0 +1,86 @@
+# webapp/clustering.py
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_ZOOM = 1
+MAX_MARKERS = 1500     # upper bound on markers sent to the browser
+CELLS_PER_TILE = 4     # grid cells per 256px map tile, i.e. ~64px clusters
+
+
+def parse_viewport(relayout_data):
+    """
+    Extracts (zoom, bounds) from a scatter_mapbox relayoutData payload.
+    Bounds are (lon_min, lat_min, lon_max, lat_max), or None for the whole world.
+    """
+    if not relayout_data:
+        return DEFAULT_ZOOM, None
+
+    zoom = relayout_data.get("mapbox.zoom", DEFAULT_ZOOM)
+    corners = (relayout_data.get("mapbox._derived") or {}).get("coordinates")
+    if not corners:
+        return zoom, None
+
+    lons = [c[0] for c in corners]
+    lats = [c[1] for c in corners]
+    return zoom, (min(lons), min(lats), max(lons), max(lats))
+
+
+def in_viewport(frame, bounds):
+    """
+    Keeps the rows that fall inside the visible map area.
+    """
+    if bounds is None:
+        return frame
+    lon_min, lat_min, lon_max, lat_max = bounds
+    if lon_max - lon_min >= 360:
+        lon_ok = np.ones(len(frame), dtype=bool)
+    else:
+        # Wrap longitudes into the viewport's window so the antimeridian works
+        lon = (frame["Longitude"].to_numpy() - lon_min) % 360 + lon_min
+        lon_ok = lon <= lon_max
+    lat = frame["Latitude"].to_numpy()
+    return frame[lon_ok & (lat >= lat_min) & (lat <= lat_max)]
+
+
+def grid_clusters(frame, cell_deg):
+    """
+    Aggregates points into square grid cells of `cell_deg` degrees.
+    Each cluster sits at the mean position of its crashes.
+    """
+    cell_x = np.floor(frame["Longitude"].to_numpy() / cell_deg).astype(np.int64)
+    cell_y = np.floor(frame["Latitude"].to_numpy() / cell_deg).astype(np.int64)
+
+    return pd.DataFrame({
+        "cell_x": cell_x,
+        "cell_y": cell_y,
+        "Latitude": frame["Latitude"].to_numpy(),
+        "Longitude": frame["Longitude"].to_numpy(),
+        "Fatalities_air": frame["Fatalities_air"].to_numpy(),
+    }).groupby(["cell_x", "cell_y"], sort=False).agg(
+        Latitude=("Latitude", "mean"),
+        Longitude=("Longitude", "mean"),
+        Crashes=("Fatalities_air", "size"),
+        Fatalities_air=("Fatalities_air", "sum"),
+    ).reset_index(drop=True)
+
+
+def cluster_points(frame, zoom=DEFAULT_ZOOM, bounds=None, max_markers=MAX_MARKERS):
+    """
+    Decimates the crash points for the current viewport.
+
+    Returns (points, clustered). When the visible crashes fit within
+    `max_markers` they are returned as-is; otherwise they are merged on a
+    grid sized for the zoom level, coarsening the grid until the cluster
+    count fits too, so the payload stays bounded however many rows match.
+    """
+    visible = in_viewport(frame, bounds)
+    if len(visible) <= max_markers:
+        return visible, False
+
+    cell_deg = 360 / (2 ** max(zoom, 0) * CELLS_PER_TILE)
+    clusters = grid_clusters(visible, cell_deg)
+    while len(clusters) > max_markers:
+        cell_deg *= 2
+        clusters = grid_clusters(visible, cell_deg)
+    return clusters, True
@@ -0,0 +1,139 @@
+# webapp/cube.py
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+from filter_cache import normalize_filters
+
+# Lower edges of the fatality buckets; the last bucket is open-ended
+FATALITY_EDGES = np.array([0, 1, 2, 3, 5, 10, 20, 50, 100, 150, 200, 250, 300, 400, 500])
+
+DIMENSIONS = ["Year", "Operator", "Country/Region", "Bucket"]
+
+
+def fatality_bucket(values):
+    """
+    Maps fatality counts to the index of the bucket that holds them.
+    """
+    return np.searchsorted(FATALITY_EDGES, np.clip(values, 0, None), side="right") - 1
+
+
+def _reduce(cells, by):
+    """
+    Rolls cube cells up to `by`, combining count/sum/max.
+    """
+    return cells.groupby(by, dropna=False, observed=True).agg(
+        count=("count", "sum"),
+        sum=("sum", "sum"),
+        max=("max", "max"),
+    ).reset_index()
+
+
+class CrashCube:
+    """
+    Pre-aggregated year × operator × country × fatality-bucket cube, plus
+    a year × country × bucket rollup for the (common) no-operator queries.
+
+    Every cell stores the crash count, the fatality sum and the worst crash,
+    which is all the KPI cards, the trend line and the choropleth need. A
+    fatality range is answered from whole buckets where it covers them; only
+    the (at most two) buckets cut by the range bounds fall back to raw rows.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._version = None
+        self._lock = threading.Lock()
+
+    def _build(self, df):
+        buckets = fatality_bucket(df["Fatalities_air"].to_numpy())
+        keyed = df[["Year", "Operator", "Country/Region", "Fatalities_air"]].assign(
+            Operator=df["Operator"].astype("category"),
+            Bucket=buckets,
+        )
+
+        self.cells = keyed.groupby(DIMENSIONS, dropna=False, observed=True).agg(
+            count=("Fatalities_air", "size"),
+            sum=("Fatalities_air", "sum"),
+            max=("Fatalities_air", "max"),
+        ).reset_index()
+        # Operators make the full cube nearly one cell per crash; without an
+        # operator filter the rollup's size depends on years × countries only
+        self.rollup = _reduce(self.cells, ["Year", "Country/Region", "Bucket"])
+
+        # Bucket bounds as inclusive integer ranges; the open bucket ends at the data max
+        upper = np.append(FATALITY_EDGES[1:] - 1, max(int(df["Fatalities_air"].max()), FATALITY_EDGES[-1]))
+        self.bucket_bounds = list(zip(FATALITY_EDGES.tolist(), upper.tolist()))
+
+        # Row positions per bucket, for the partially covered ones
+        order = np.argsort(buckets, kind="stable")
+        starts = np.searchsorted(buckets[order], np.arange(len(FATALITY_EDGES) + 1))
+        self.bucket_rows = [order[starts[b]:starts[b + 1]] for b in range(len(FATALITY_EDGES))]
+
+        print(f"Built crash cube: {len(self.cells)} cells ({len(self.rollup)} without operators) "
+              f"from {len(df)} rows.")
+
+    def _refresh(self):
+        df = self.store.frame()
+        if self._version != self.store.version:
+            with self._lock:
+                if self._version != self.store.version:
+                    self._build(df)
+                    self._version = self.store.version
+        return df
+
+    def query(self, year_range, selected_operators, fatalities_range):
+        """
+        Returns the cells (Year, Country/Region, count, sum, max) matching the
+        filters, ready to be rolled up by the views.
+        """
+        df = self._refresh()
+        y0, y1, operators, f0, f1 = normalize_filters(year_range, selected_operators, fatalities_range)
+
+        full, partial = [], []
+        for b, (lo, hi) in enumerate(self.bucket_bounds):
+            if lo >= f0 and hi <= f1:
+                full.append(b)
+            elif lo <= f1 and hi >= f0:
+                partial.append(b)
+
+        cells = self.cells if operators else self.rollup
+        mask = (cells["Year"] >= y0) & (cells["Year"] <= y1) & cells["Bucket"].isin(full)
+        if operators:
+            mask &= cells["Operator"].isin(operators)
+        parts = [cells.loc[mask, ["Year", "Country/Region", "count", "sum", "max"]]]
+
+        if partial:
+            rows = df.iloc[np.concatenate([self.bucket_rows[b] for b in partial])]
+            rows = rows[
+                (rows["Year"] >= y0) & (rows["Year"] <= y1) &
+                (rows["Fatalities_air"] >= f0) & (rows["Fatalities_air"] <= f1)
+            ]
+            if operators:
+                rows = rows[rows["Operator"].isin(operators)]
+            parts.append(rows.groupby(["Year", "Country/Region"], dropna=False, observed=True).agg(
+                count=("Fatalities_air", "size"),
+                sum=("Fatalities_air", "sum"),
+                max=("Fatalities_air", "max"),
+            ).reset_index())
+
+        return pd.concat(parts, ignore_index=True)
+
+    def totals(self, year_range, selected_operators, fatalities_range):
+        """
+        Returns (crashes, fatalities, worst crash) for the KPI cards.
+        """
+        cells = self.query(year_range, selected_operators, fatalities_range)
+        if cells.empty:
+            return 0, 0, 0
+        return int(cells["count"].sum()), int(cells["sum"].sum()), int(cells["max"].max())
+
+    def by_year(self, year_range, selected_operators, fatalities_range):
+        cells = self.query(year_range, selected_operators, fatalities_range)
+        return _reduce(cells, "Year").sort_values("Year")
+
+    def by_country(self, year_range, selected_operators, fatalities_range):
+        cells = self.query(year_range, selected_operators, fatalities_range)
+        return _reduce(cells.dropna(subset=["Country/Region"]), "Country/Region")
@@ -0,0 +1,173 @@
+# webapp/data_store.py
+
+import hashlib
+import os
+import sys
+import threading
+
+import pandas as pd
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# The pipeline's storage helpers (src/storage.py); appended so webapp modules win on name clashes
+sys.path.append(os.path.join(BASE_DIR, "src"))
+from storage import read_table  # noqa: E402
+
+DATA_FILE = os.path.join(BASE_DIR, "data", "processed", "cleaned_aircrashes_geo_FINAL.csv")
+# Prepared copy for production serving: Arrow IPC, uncompressed so workers can mmap it
+ARROW_FILE = os.path.join(BASE_DIR, "data", "processed", "cleaned_aircrashes_geo_FINAL.arrow")
+
+MONTH_MAP = {
+    'January': 1, 'February': 2, 'March': 3, 'April': 4,
+    'May': 5, 'June': 6, 'July': 7, 'August': 8,
+    'September': 9, 'October': 10, 'November': 11, 'December': 12
+}
+
+REQUIRED_COLUMNS = ['Year', 'Month', 'Day', 'Latitude', 'Longitude', 'Fatalities_air']
+
+# Repetitive text columns, stored dictionary-encoded in the Arrow file
+CATEGORY_COLUMNS = ['Country/Region', 'Aircraft', 'Location', 'Operator']
+
+# Everything the dashboard shows or filters on; the other columns are never read
+SOURCE_COLUMNS = REQUIRED_COLUMNS + CATEGORY_COLUMNS
+
+
+def prepare_frame(df):
+    """
+    Normalizes the raw crash table once so callbacks never have to:
+    month names become numbers, incomplete rows are dropped, Year/Month/Day
+    become integers and a real datetime 'Date' column is built.
+
+    Args:
+        df (DataFrame): The table as read from disk.
+
+    Returns:
+        DataFrame: The prepared table with a fresh RangeIndex.
+    """
+    df = df.copy()
+
+    if not pd.api.types.is_numeric_dtype(df['Month']):
+        df['Month'] = df['Month'].map(MONTH_MAP)
+
+    df = df.dropna(subset=REQUIRED_COLUMNS)
+
+    for col in ['Year', 'Month', 'Day']:
+        df[col] = df[col].astype(int)
+    df['Fatalities_air'] = df['Fatalities_air'].astype(int)
+
+    df['Date'] = pd.to_datetime(dict(
+        year=df['Year'],
+        month=df['Month'],
+        day=df['Day']
+    ), errors='coerce')
+
+    return df.reset_index(drop=True)
+
+
+def read_source(path):
+    """
+    Reads the dashboard's columns of the crash table, Parquet or CSV. For a
+    CSV, an up-to-date .parquet copy beside it is read instead (storage.read_table).
+    """
+    return read_table(path, columns=SOURCE_COLUMNS)
+
+
+def read_arrow(path):
+    """
+    Memory-maps a prepared Arrow IPC file. Numeric and date columns stay
+    backed by the shared page cache, so every worker process reading the
+    same file shares one copy of them.
+    """
+    import pyarrow as pa
+
+    with pa.memory_map(path, "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+    # split_blocks avoids consolidating columns, which would copy them
+    return table.to_pandas(split_blocks=True, self_destruct=False)
+
+
+def export_arrow(csv_path=None, arrow_path=ARROW_FILE):
+    """
+    Writes the prepared crash table as an uncompressed Arrow IPC (Feather v2)
+    file for memory-mapped serving.
+    """
+    import pyarrow.feather as feather
+
+    df = prepare_frame(read_source(csv_path or DATA_FILE))
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+
+    # Replace atomically: workers still mapping the old file keep a valid inode
+    temp_file = arrow_path + ".tmp"
+    feather.write_feather(df, temp_file, compression="uncompressed")
+    os.replace(temp_file, arrow_path)
+    print(f"Prepared dataset saved: {arrow_path} ({len(df)} rows)")
+
+
+class CrashDataStore:
+    """
+    Loads the crash dataset once and hands the same prepared frame to every
+    callback. The file is only re-read when its mtime changes *and* its
+    content hash differs from the one already loaded.
+
+    The frame is shared between callbacks and must be treated as read-only;
+    the app enables pandas copy-on-write so an accidental in-place edit in a
+    callback only ever touches a private copy.
+    """
+
+    def __init__(self, path=None):
+        path = path or os.environ.get("AIRCRASH_DATA") or DATA_FILE
+        self.path = path
+        self.version = 0          # bumped on every (re)load, used as a cache key
+        self._df = None
+        self._mtime = None
+        self._digest = None
+        self._lock = threading.Lock()
+
+    def _file_digest(self):
+        h = hashlib.sha1()
+        with open(self.path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def _load(self, mtime, digest):
+        if self.path.endswith((".arrow", ".feather")):
+            self._df = read_arrow(self.path)   # already prepared by export_arrow()
+        else:
+            self._df = prepare_frame(read_source(self.path))
+        self._mtime = mtime
+        self._digest = digest
+        self.version += 1
+        print(f"Loaded {len(self._df)} crashes from {self.path} (v{self.version}).")
+
+    @property
+    def digest(self):
+        """
+        SHA-1 of the file content currently loaded.
+        """
+        self.frame()
+        return self._digest
+
+    def frame(self):
+        """
+        Returns the prepared DataFrame, reloading it first if the file changed.
+        """
+        mtime = os.stat(self.path).st_mtime_ns
+        if self._df is not None and mtime == self._mtime:
+            return self._df
+
+        with self._lock:
+            # Another thread may have reloaded while we waited for the lock
+            if self._df is None or mtime != self._mtime:
+                digest = self._file_digest()
+                if digest != self._digest:
+                    self._load(mtime, digest)
+                else:
+                    self._mtime = mtime  # touched but unchanged
+        return self._df
+
+
+if __name__ == "__main__":
+    export_arrow()
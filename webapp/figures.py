@@ -0,0 +1,151 @@
+# webapp/figures.py
+#
+# Each chart is built once with its full layout (styles, colour scales,
+# choropleth geography) and embedded in the page. Callbacks then send a
+# dash.Patch that swaps only the trace data arrays. The arrays come from the
+# *_data() helpers, which return plain lists so they can also be stored in
+# the prerendered snapshot.
+
+import numpy as np
+import plotly.graph_objects as go
+from dash import Patch
+
+MAP_SIZE_MAX = 15
+CLUSTER_SIZE_MAX = 30
+TREND_METRICS = ["Total_Crashes", "Total_Fatalities"]
+
+
+def map_figure(data=None):
+    data = data or {"lat": [], "lon": [], "text": [], "size": [], "color": []}
+    fig = go.Figure(go.Scattermapbox(
+        lat=data["lat"], lon=data["lon"], text=data["text"],
+        mode="markers",
+        hoverinfo="text",
+        marker=dict(
+            size=data["size"], color=data["color"],
+            colorscale="Reds",
+            showscale=True,
+            colorbar=dict(title="Fatalities_air"),
+        ),
+    ))
+    # uirevision keeps the user's zoom/pan when the data arrays change
+    fig.update_layout(
+        mapbox=dict(style="carto-positron", zoom=1, center=dict(lat=20, lon=0)),
+        margin={"r": 0, "t": 0, "l": 0, "b": 0},
+        height=700,
+        uirevision="crash-map",
+    )
+    return fig
+
+
+def _marker_sizes(values, size_max):
+    # Same area scaling as px.scatter_mapbox(size=..., size_max=...)
+    values = np.asarray(values, dtype=float)
+    top = values.max() if len(values) else 0
+    if top <= 0:
+        return np.full(len(values), 3.0)
+    return np.maximum(size_max * np.sqrt(values / top), 3.0).round(1)
+
+
+def map_data(points, clustered):
+    """
+    Returns the map's marker arrays for `points`, either clustered
+    (Crashes, Fatalities_air) or individual crash rows.
+    """
+    fatalities = points["Fatalities_air"].astype(str)
+    if clustered:
+        sizes = _marker_sizes(points["Crashes"], CLUSTER_SIZE_MAX)
+        text = points["Crashes"].astype(str) + " crashes<br>Fatalities_air=" + fatalities
+    else:
+        sizes = _marker_sizes(points["Fatalities_air"], MAP_SIZE_MAX)
+        text = (
+            "<b>" + points["Operator"].astype(str) + "</b><br>"
+            + "Date=" + points["Date"].dt.strftime("%Y-%m-%d").fillna("") + "<br>"
+            + "Aircraft=" + points["Aircraft"].astype(str) + "<br>"
+            + "Fatalities_air=" + fatalities + "<br>"
+            + "Location=" + points["Location"].astype(str)
+        )
+
+    return {
+        "lat": points["Latitude"].tolist(),
+        "lon": points["Longitude"].tolist(),
+        "text": text.tolist(),
+        "size": sizes.tolist(),
+        "color": points["Fatalities_air"].tolist(),
+    }
+
+
+def map_patch(data):
+    """
+    Returns a Patch replacing the map's marker arrays.
+    """
+    patched = Patch()
+    patched["data"][0]["lat"] = data["lat"]
+    patched["data"][0]["lon"] = data["lon"]
+    patched["data"][0]["text"] = data["text"]
+    patched["data"][0]["marker"]["size"] = data["size"]
+    patched["data"][0]["marker"]["color"] = data["color"]
+    return patched
+
+
+def trend_figure(data=None):
+    data = data or {"x": [], **{metric: [] for metric in TREND_METRICS}}
+    fig = go.Figure([
+        go.Scatter(x=data["x"], y=data[metric], mode="lines", name=metric,
+                   hovertemplate=f"Metric={metric}<br>Year=%{{x}}<br>Count=%{{y}}<extra></extra>")
+        for metric in TREND_METRICS
+    ])
+    fig.update_layout(
+        title="Yearly Trends of Crashes and Fatalities",
+        xaxis_title="Year",
+        yaxis_title="Count",
+        template="plotly_white",
+        margin={"r": 20, "t": 40, "l": 20, "b": 40},
+        legend_title_text=""
+    )
+    return fig
+
+
+def trend_data(yearly):
+    return {"x": yearly["Year"].tolist(), **{metric: yearly[metric].tolist() for metric in TREND_METRICS}}
+
+
+def trend_patch(data):
+    """
+    Returns a Patch replacing the x/y arrays of the two trend lines.
+    """
+    patched = Patch()
+    for i, metric in enumerate(TREND_METRICS):
+        patched["data"][i]["x"] = data["x"]
+        patched["data"][i]["y"] = data[metric]
+    return patched
+
+
+def choropleth_figure(data=None):
+    data = data or {"locations": [], "z": []}
+    fig = go.Figure(go.Choropleth(
+        locations=data["locations"], z=data["z"],
+        locationmode="country names",
+        colorscale="Reds",
+        colorbar=dict(title="Total_Crashes"),
+        hovertemplate="<b>%{location}</b><br>Total_Crashes=%{z}<extra></extra>",
+    ))
+    fig.update_layout(title="Total Crashes by Country", margin={"r": 0, "t": 40, "l": 0, "b": 0})
+    return fig
+
+
+def choropleth_data(grouped):
+    return {
+        "locations": grouped["Country/Region"].tolist(),
+        "z": grouped["Total_Crashes"].tolist(),  # Can also switch to "Total_Fatalities"
+    }
+
+
+def choropleth_patch(data):
+    """
+    Returns a Patch replacing the choropleth's countries and values.
+    """
+    patched = Patch()
+    patched["data"][0]["locations"] = data["locations"]
+    patched["data"][0]["z"] = data["z"]
+    return patched
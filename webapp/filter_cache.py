@@ -0,0 +1,95 @@
+# webapp/filter_cache.py
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from metrics import note_cache
+
+
+def normalize_filters(year_range, selected_operators, fatalities_range):
+    """
+    Turns the raw callback inputs into a hashable key. Operator order and
+    duplicates don't change the result, so they don't change the key either.
+    """
+    operators = tuple(sorted(set(selected_operators))) if selected_operators else ()
+    return (
+        int(year_range[0]), int(year_range[1]),
+        operators,
+        int(fatalities_range[0]), int(fatalities_range[1]),
+    )
+
+
+class FilterCache:
+    """
+    Bounded LRU cache of filter results, shared by all callbacks.
+
+    Each entry holds the positional indices of the rows matching one filter
+    state, so a callback only pays for `df.iloc[rows]`. Entries are keyed by
+    the data store version too, which makes a reload invalidate them.
+    """
+
+    def __init__(self, store, maxsize=128):
+        self.store = store
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _compute(self, df, key):
+        y0, y1, operators, f0, f1 = key
+        mask = (
+            (df["Year"] >= y0) & (df["Year"] <= y1) &
+            (df["Fatalities_air"] >= f0) & (df["Fatalities_air"] <= f1)
+        )
+        if operators:
+            mask &= df["Operator"].isin(operators)
+        return np.flatnonzero(mask.to_numpy())
+
+    def rows(self, year_range, selected_operators, fatalities_range):
+        """
+        Returns the positional indices of the rows matching the filters.
+        """
+        df = self.store.frame()
+        key = (self.store.version,) + normalize_filters(year_range, selected_operators, fatalities_range)
+
+        with self._lock:
+            rows = self._entries.get(key)
+            if rows is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                note_cache(hit=True)
+                return rows
+            self.misses += 1
+        note_cache(hit=False)
+
+        # Computed outside the lock; two threads racing on the same key just
+        # produce the same array twice
+        rows = self._compute(df, key[1:])
+        rows.setflags(write=False)
+
+        with self._lock:
+            self._entries[key] = rows
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return rows
+
+    def frame(self, year_range, selected_operators, fatalities_range):
+        """
+        Returns the filtered slice of the shared crash frame.
+        """
+        rows = self.rows(year_range, selected_operators, fatalities_range)
+        return self.store.frame().iloc[rows]
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
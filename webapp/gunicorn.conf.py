@@ -0,0 +1,53 @@
+# webapp/gunicorn.conf.py
+#
+# Production serving: several worker processes sharing one memory-mapped copy
+# of the prepared dataset.
+#
+#   cd webapp
+#   python data_store.py                 # writes the .arrow file next to the CSV
+#   gunicorn -c gunicorn.conf.py
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+from data_store import ARROW_FILE
+
+wsgi_app = "app:server"
+bind = os.environ.get("AIRCRASH_BIND", "0.0.0.0:8050")
+workers = int(os.environ.get("AIRCRASH_WORKERS", min(multiprocessing.cpu_count(), 8)))
+timeout = 60
+
+# Serve from the Arrow file when it has been prepared; workers inherit this
+if "AIRCRASH_DATA" not in os.environ and os.path.exists(ARROW_FILE):
+    os.environ["AIRCRASH_DATA"] = ARROW_FILE
+
+# Workers save their metrics here so /metrics can add them all up (see
+# metrics.py); emptied at startup, so counts start from zero on each run
+if "AIRCRASH_METRICS_DIR" not in os.environ:
+    os.environ["AIRCRASH_METRICS_DIR"] = os.path.join(tempfile.gettempdir(), f"aircrash-metrics-{os.getpid()}")
+
+# Each worker imports the app itself (no preload), so the dataset pages come
+# from the shared mmap rather than from copies made in the master process.
+preload_app = False
+
+
+def on_starting(server):
+    shutil.rmtree(os.environ["AIRCRASH_METRICS_DIR"], ignore_errors=True)
+    os.makedirs(os.environ["AIRCRASH_METRICS_DIR"])
+
+
+def post_worker_init(worker):
+    # Runs after the worker loaded the app and before it accepts requests
+    import app
+
+    app.warm_up()
+    worker.log.info("Worker %s warmed up", worker.pid)
+
+
+def worker_exit(server, worker):
+    # Save the last metrics recorded since the previous periodic flush
+    import metrics
+
+    metrics.registry.flush()
@@ -0,0 +1,312 @@
+# webapp/metrics.py
+#
+# Per-callback latency and payload instrumentation.
+#
+# Each instrumented callback call gets a trace. Code inside it marks its
+# stages with `with stage("filter"): ...`; the stages used are
+#   data       – getting the shared frame from the store
+#   filter     – filter cache / cube lookups
+#   figure     – building the figure, table or KPI payload
+#   serialize  – Dash turning the result into the HTTP response
+# The serialize stage and the response size are measured at the Flask level:
+# request time minus time spent in the callback body, and the body length.
+#
+# Histograms are served in Prometheus text format on /metrics. Setting
+# AIRCRASH_METRICS_LOG=<file> also writes one JSON line per callback call.
+#
+# Each process keeps its own registry. Under several gunicorn workers the
+# /metrics request lands on one of them, so with AIRCRASH_METRICS_DIR=<dir>
+# (set by gunicorn.conf.py) every worker also saves its registry there as
+# <pid>.json, and /metrics adds up all the files. Saving happens off the
+# request path: a background thread writes the file at most every
+# FLUSH_SECONDS when something was recorded, and once more at worker exit.
+# Other workers' numbers can therefore lag by up to FLUSH_SECONDS. Files of
+# exited workers are kept, so counts never go backwards within a run.
+
+import atexit
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+STAGES = ("data", "filter", "figure", "serialize")
+FLUSH_SECONDS = 1.0
+
+_local = threading.local()
+log = logging.getLogger("aircrash.metrics")
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)   # last slot is +Inf
+        self.total = 0.0
+        self.n = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += value
+        self.n += 1
+
+    def merge(self, state):
+        self.counts = [a + b for a, b in zip(self.counts, state["counts"])]
+        self.total += state["total"]
+        self.n += state["n"]
+
+    def state(self):
+        return {"counts": list(self.counts), "total": self.total, "n": self.n}
+
+    def render(self, name, labels):
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {self.total:.6f}")
+        lines.append(f"{name}_count{{{labels}}} {self.n}")
+        return lines
+
+
+class Trace:
+    def __init__(self, callback):
+        self.callback = callback
+        self.stages = dict.fromkeys(STAGES, 0.0)
+        self.callback_seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+class Registry:
+    def __init__(self, shared_dir=None):
+        self._lock = threading.Lock()
+        self.latency = {}        # (callback, stage) -> Histogram
+        self.payload = {}        # callback -> Histogram
+        self.cache = {}          # (callback, "hit"|"miss") -> count
+        self.shared_dir = shared_dir
+        self._dirty = False
+        self._save_lock = threading.Lock()
+        self._flusher = None
+
+    def record(self, trace, request_seconds=None, response_bytes=None):
+        if request_seconds is not None:
+            trace.stages["serialize"] = max(request_seconds - trace.callback_seconds, 0.0)
+        total = request_seconds if request_seconds is not None else trace.callback_seconds
+
+        with self._lock:
+            for stage, seconds in list(trace.stages.items()) + [("total", total)]:
+                self.latency.setdefault((trace.callback, stage), Histogram(LATENCY_BUCKETS)).observe(seconds)
+            if response_bytes is not None:
+                self.payload.setdefault(trace.callback, Histogram(BYTES_BUCKETS)).observe(response_bytes)
+            for result, n in (("hit", trace.cache_hits), ("miss", trace.cache_misses)):
+                key = (trace.callback, result)
+                self.cache[key] = self.cache.get(key, 0) + n
+            self._dirty = True
+        if self.shared_dir and self._flusher is None:
+            self._start_flusher()
+
+        if log.handlers:
+            log.info(json.dumps({
+                "ts": round(time.time(), 3),
+                "callback": trace.callback,
+                "total_s": round(total, 6),
+                **{f"{stage}_s": round(seconds, 6) for stage, seconds in trace.stages.items()},
+                "bytes": response_bytes,
+                "cache_hits": trace.cache_hits,
+                "cache_misses": trace.cache_misses,
+            }))
+
+    def state(self):
+        return {
+            "latency": [[callback, stage, hist.state()] for (callback, stage), hist in self.latency.items()],
+            "payload": [[callback, hist.state()] for callback, hist in self.payload.items()],
+            "cache": [[callback, result, n] for (callback, result), n in self.cache.items()],
+        }
+
+    def merge(self, state):
+        for callback, stage, hist in state["latency"]:
+            self.latency.setdefault((callback, stage), Histogram(LATENCY_BUCKETS)).merge(hist)
+        for callback, hist in state["payload"]:
+            self.payload.setdefault(callback, Histogram(BYTES_BUCKETS)).merge(hist)
+        for callback, result, n in state["cache"]:
+            self.cache[(callback, result)] = self.cache.get((callback, result), 0) + n
+
+    def _start_flusher(self):
+        with self._save_lock:
+            if self._flusher is not None:
+                return
+
+            def run():
+                while True:
+                    time.sleep(FLUSH_SECONDS)
+                    self.flush()
+
+            # Started in the worker on first use: threads don't survive a fork
+            self._flusher = threading.Thread(target=run, name="metrics-flush", daemon=True)
+            self._flusher.start()
+            atexit.register(self.flush)
+
+    def flush(self):
+        """
+        Saves this process's state to the shared directory if anything was
+        recorded since the last save.
+        """
+        if not self.shared_dir:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            state = self.state()
+            self._dirty = False
+        # Written under a temporary name so /metrics in another worker never
+        # reads a half-written file; the registry lock is not held meanwhile
+        path = os.path.join(self.shared_dir, f"{os.getpid()}.json")
+        with self._save_lock:
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(path + ".tmp", path)
+
+    def combined(self):
+        """
+        A registry adding up every worker's saved state (this one if no
+        shared directory is set).
+        """
+        if not self.shared_dir:
+            return self
+        total = Registry()
+        with self._lock:
+            total.merge(self.state())
+        own = f"{os.getpid()}.json"
+        for name in os.listdir(self.shared_dir):
+            if not name.endswith(".json") or name == own:
+                continue
+            try:
+                with open(os.path.join(self.shared_dir, name), encoding="utf-8") as f:
+                    total.merge(json.load(f))
+            except (OSError, ValueError):
+                continue   # removed or replaced while listing
+        return total
+
+    def render(self):
+        """
+        Returns all metrics in Prometheus text exposition format.
+        """
+        with self._lock:
+            lines = ["# TYPE aircrash_callback_seconds histogram"]
+            for (callback, stage), hist in sorted(self.latency.items()):
+                lines += hist.render("aircrash_callback_seconds", f'callback="{callback}",stage="{stage}"')
+            lines.append("# TYPE aircrash_response_bytes histogram")
+            for callback, hist in sorted(self.payload.items()):
+                lines += hist.render("aircrash_response_bytes", f'callback="{callback}"')
+            lines.append("# TYPE aircrash_filter_cache_total counter")
+            for (callback, result), n in sorted(self.cache.items()):
+                lines.append(f'aircrash_filter_cache_total{{callback="{callback}",result="{result}"}} {n}')
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry(os.environ.get("AIRCRASH_METRICS_DIR"))
+
+
+def _current():
+    return getattr(_local, "trace", None)
+
+
+@contextmanager
+def stage(name):
+    """
+    Times a block of code as `name` in the active trace (no-op without one).
+    """
+    trace = _current()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.stages[name] += time.perf_counter() - start
+
+
+def note_cache(hit):
+    """
+    Counts a filter cache hit or miss against the active trace.
+    """
+    trace = _current()
+    if trace is not None:
+        if hit:
+            trace.cache_hits += 1
+        else:
+            trace.cache_misses += 1
+
+
+def instrumented(name):
+    """
+    Decorator for Dash callbacks: opens a trace around the callback body.
+
+    Inside a Flask request the trace is finished by the after_request hook
+    installed by `init_app`, which adds the serialize time and response
+    size; outside one (benchmarks, snapshot builds) it is recorded directly.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            trace = Trace(name)
+            _local.trace = trace
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                trace.callback_seconds = time.perf_counter() - start
+                _local.trace = None
+                _finish(trace)
+        return wrapper
+    return decorator
+
+
+def _finish(trace):
+    from flask import g, has_request_context
+
+    if has_request_context():
+        g.metrics_trace = trace
+    else:
+        registry.record(trace)
+
+
+def init_app(server):
+    """
+    Adds the request hooks and the /metrics endpoint to the Flask server.
+    """
+    from flask import Response, g
+
+    log_file = os.environ.get("AIRCRASH_METRICS_LOG")
+    if log_file and not log.handlers:
+        handler = logging.FileHandler(log_file, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        log.addHandler(handler)
+        log.setLevel(logging.INFO)
+        log.propagate = False
+
+    @server.before_request
+    def _start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @server.after_request
+    def _record(response):
+        trace = g.pop("metrics_trace", None)
+        if trace is not None:
+            request_seconds = time.perf_counter() - g.metrics_start
+            size = response.calculate_content_length()
+            registry.record(trace, request_seconds, size)
+        return response
+
+    @server.route("/metrics")
+    def metrics():
+        return Response(registry.combined().render(), mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,111 @@
+# webapp/operator_index.py
+
+import re
+import threading
+from collections import defaultdict
+
+MAX_PREFIX = 6        # token prefixes longer than this share a bucket
+FUZZY_CUTOFF = 0.5    # share of query trigrams a fuzzy match must contain
+
+
+def normalize_name(name):
+    return re.sub(r"[^0-9a-z]+", " ", str(name).lower()).strip()
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class OperatorIndex:
+    """
+    Search index over operator names for the operator dropdown.
+
+    Built once per data version: a token-prefix index for as-you-type
+    matches and a trigram index for typos. Results are ranked by crash
+    count, so the busiest operators come first.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._version = None
+        self._lock = threading.Lock()
+
+    def _build(self, df):
+        counts = df["Operator"].value_counts()   # already sorted by count, desc
+        counts = counts[counts > 0]               # unused categories of a categorical column
+        self.names = counts.index.tolist()
+        self.counts = counts.to_numpy()
+        self.normalized = [normalize_name(n) for n in self.names]
+
+        self.prefixes = defaultdict(list)
+        self.grams = defaultdict(list)
+        for i, norm in enumerate(self.normalized):
+            seen = set()
+            for token in norm.split():
+                for k in range(1, min(len(token), MAX_PREFIX) + 1):
+                    seen.add(token[:k])
+            # Ids are appended in rank order, so every posting list stays sorted by count
+            for prefix in seen:
+                self.prefixes[prefix].append(i)
+            for gram in trigrams(norm):
+                self.grams[gram].append(i)
+
+    def _refresh(self):
+        self.store.frame()
+        if self._version != self.store.version:
+            with self._lock:
+                if self._version != self.store.version:
+                    self._build(self.store.frame())
+                    self._version = self.store.version
+
+    def top(self, limit):
+        """
+        Returns the `limit` operators with the most crashes.
+        """
+        self._refresh()
+        return self.names[:limit]
+
+    def _prefix_matches(self, tokens):
+        candidates = None
+        for token in tokens:
+            ids = set(self.prefixes.get(token[:MAX_PREFIX], ()))
+            candidates = ids if candidates is None else candidates & ids
+            if not candidates:
+                return []
+
+        # Long tokens only hit their first MAX_PREFIX characters, check the rest
+        long_tokens = [t for t in tokens if len(t) > MAX_PREFIX]
+        matches = [
+            i for i in candidates
+            if all(any(w.startswith(t) for w in self.normalized[i].split()) for t in long_tokens)
+        ]
+        return sorted(matches)
+
+    def _fuzzy_matches(self, query):
+        query_grams = trigrams(query)
+        shared = defaultdict(int)
+        for gram in query_grams:
+            for i in self.grams.get(gram, ()):
+                shared[i] += 1
+
+        needed = FUZZY_CUTOFF * len(query_grams)
+        scored = [(round(n / len(query_grams), 1), i) for i, n in shared.items() if n >= needed]
+        # Best score first, crash count (= lower id) breaks ties
+        return [i for score, i in sorted(scored, key=lambda s: (-s[0], s[1]))]
+
+    def search(self, query, limit=20):
+        """
+        Returns up to `limit` operator names matching `query`: prefix matches
+        on every word first, then fuzzy matches, each ranked by crash count.
+        """
+        self._refresh()
+        query = normalize_name(query)
+        if not query:
+            return self.names[:limit]
+
+        ids = self._prefix_matches(query.split())[:limit]
+        if len(ids) < limit:
+            found = set(ids)
+            ids += [i for i in self._fuzzy_matches(query) if i not in found][:limit - len(ids)]
+        return [self.names[i] for i in ids]
@@ -0,0 +1,57 @@
+# webapp/snapshot.py
+#
+# Build step for the dashboard's first paint. Every visitor lands on the same
+# default filters, so their figures, KPI values and first table page are
+# rendered once and saved next to the dataset. The layout embeds them and no
+# callback runs until the user touches a filter.
+#
+#   cd webapp
+#   python snapshot.py
+
+import json
+import os
+
+from plotly.utils import PlotlyJSONEncoder
+
+from data_store import BASE_DIR
+
+SNAPSHOT_FILE = os.path.join(BASE_DIR, "data", "processed", "dashboard_snapshot.json")
+
+
+def save_snapshot(state, digest, filters, path=SNAPSHOT_FILE):
+    """
+    Writes the rendered default state, tagged with the dataset hash and the
+    filters it was rendered for.
+    """
+    payload = {"data_digest": digest, "filters": filters, "state": state}
+    temp_file = path + ".tmp"
+    with open(temp_file, "w", encoding="utf-8") as f:
+        json.dump(payload, f, cls=PlotlyJSONEncoder)
+    os.replace(temp_file, path)
+    print(f"Snapshot saved: {path}")
+
+
+def load_snapshot(digest, filters, path=SNAPSHOT_FILE):
+    """
+    Returns the stored default state, or None if there is no snapshot or it
+    was rendered from another dataset or for other default filters.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            payload = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable snapshot {path}: {e}")
+        return None
+
+    if payload.get("data_digest") != digest or payload.get("filters") != filters:
+        print("Snapshot is stale, rendering the default state at startup instead.")
+        return None
+    return payload["state"]
+
+
+if __name__ == "__main__":
+    import app
+
+    save_snapshot(app.render_state(*app.DEFAULT_FILTERS), app.store.digest, app.DEFAULT_FILTERS)
@@ -0,0 +1,92 @@
+# webapp/table_pages.py
+
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from filter_cache import normalize_filters
+from metrics import stage
+
+TABLE_COLUMNS = ["Date", "Operator", "Aircraft", "Location", "Fatalities_air"]
+DEFAULT_SORT = [{"column_id": "Date", "direction": "desc"}]
+
+
+class TablePager:
+    """
+    Server-side paging and sorting for the recent-crashes table.
+
+    Per data version, every sortable column gets a rank array in both
+    directions (missing values last). A filter result is put in sort order
+    once by looking up those ranks, then memoized, so each page request only
+    slices and formats the rows it shows.
+    """
+
+    def __init__(self, store, filter_cache, maxsize=64):
+        self.store = store
+        self.filter_cache = filter_cache
+        self.maxsize = maxsize
+        self._version = None
+        self._orders = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _build(self, df):
+        self.ranks = {}
+        for col in TABLE_COLUMNS:
+            values = df[col]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                values = values.astype(object)   # rank by label, not by category code
+            for ascending in (True, False):
+                rank = values.rank(method="first", ascending=ascending, na_option="bottom")
+                self.ranks[col, ascending] = rank.to_numpy(dtype=np.int64)
+        self._orders.clear()
+
+    def _refresh(self):
+        df = self.store.frame()
+        if self._version != self.store.version:
+            with self._lock:
+                if self._version != self.store.version:
+                    self._build(df)
+                    self._version = self.store.version
+        return df
+
+    def _ordered_rows(self, filters, sort_by):
+        sort = (sort_by or DEFAULT_SORT)[0]
+        column = sort["column_id"] if sort["column_id"] in TABLE_COLUMNS else "Date"
+        ascending = sort["direction"] == "asc"
+        key = (self._version, normalize_filters(*filters), column, ascending)
+
+        with self._lock:
+            ordered = self._orders.get(key)
+            if ordered is not None:
+                self._orders.move_to_end(key)
+                return ordered
+
+        rows = self.filter_cache.rows(*filters)
+        ordered = rows[np.argsort(self.ranks[column, ascending][rows], kind="stable")]
+
+        with self._lock:
+            self._orders[key] = ordered
+            while len(self._orders) > self.maxsize:
+                self._orders.popitem(last=False)
+        return ordered
+
+    def page(self, year_range, selected_operators, fatalities_range,
+             page_current=0, page_size=10, sort_by=None):
+        """
+        Returns (records, page_count) for one page of the filtered crashes.
+        """
+        with stage("data"):
+            df = self._refresh()
+        with stage("filter"):
+            ordered = self._ordered_rows((year_range, selected_operators, fatalities_range), sort_by)
+
+        with stage("figure"):
+            page_count = max(math.ceil(len(ordered) / page_size), 1)
+            # A narrower filter can leave the current page past the end
+            start = min(page_current or 0, page_count - 1) * page_size
+            rows = df.iloc[ordered[start:start + page_size]][TABLE_COLUMNS]
+            rows = rows.assign(Date=rows["Date"].dt.strftime("%Y-%m-%d"))
+            return rows.to_dict("records"), page_count